@@ -0,0 +1,84 @@
+"""
+Microbenchmark: decoding a large scrape_post_details payload with each
+installed JSON backend, alone and followed by YARS's comment parsing.
+
+    python benchmarks/json_decode.py [--comments 20000] [--repeat 5]
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import timeit
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(os.path.join(project_root, "src"))
+
+from yars.jsonlib import available_backends, get_loads
+from yars.parsers import parse_post_details
+
+
+def make_comment(rng, depth, budget):
+    budget[0] -= 1
+    replies = []
+    while depth < 8 and budget[0] > 0 and rng.random() < 0.6:
+        replies.append(make_comment(rng, depth + 1, budget))
+    comment_id = f"c{budget[0]}"
+    return {
+        "kind": "t1",
+        "data": {
+            "id": comment_id,
+            "name": f"t1_{comment_id}",
+            "author": f"user{rng.randrange(10_000)}",
+            "body": "lorem ipsum dolor sit amet " * rng.randint(1, 20),
+            "score": rng.randint(-50, 5000),
+            "created_utc": 1_700_000_000 + rng.randrange(10**6),
+            "replies": (
+                {"kind": "Listing", "data": {"children": replies}} if replies else ""
+            ),
+        },
+    }
+
+
+def make_post_payload(num_comments, seed=0):
+    rng = random.Random(seed)
+    budget = [num_comments]
+    top_level = []
+    while budget[0] > 0:
+        top_level.append(make_comment(rng, 0, budget))
+    post = {"title": "Benchmark post", "selftext": "body " * 200, "score": 1}
+    return json.dumps(
+        [
+            {"kind": "Listing", "data": {"children": [{"kind": "t3", "data": post}]}},
+            {"kind": "Listing", "data": {"children": top_level}},
+        ]
+    ).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--comments", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = make_post_payload(args.comments)
+    print(f"payload: {len(payload) / 1e6:.1f} MB, {args.comments} comments")
+    print(f"{'backend':<10}{'decode ms':>12}{'decode+parse ms':>18}")
+
+    for backend in available_backends():
+        loads = get_loads(backend)
+        decode = min(
+            timeit.repeat(lambda: loads(payload), number=1, repeat=args.repeat)
+        )
+        full = min(
+            timeit.repeat(
+                lambda: parse_post_details(loads(payload)), number=1, repeat=args.repeat
+            )
+        )
+        print(f"{backend:<10}{decode * 1000:>12.1f}{full * 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+from __future__ import annotations
+from .agents import get_agent
+from .ratelimit import RateLimiter, retry_after
+from .proxies import ProxyPool
+from .jsonlib import get_loads
+from .checkpoint import Checkpoint, ListingCrawl
+from .seen import SeenSet
+from .models import Post, UserItem
+from .parsers import (
+    CommentSplicer,
+    REDDIT_URL,
+    iter_comments,
+    listing_url,
+    parse_post_details,
+    post_extractor,
+    search_result_extractor,
+    since_predicate,
+    user_item_extractor,
+)
+import os
+import time
+import asyncio
+import logging
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MORE_CHILDREN_ROUNDS = 10
+
+
+class AsyncYARS:
+    """
+    asyncio counterpart of YARS, built on aiohttp.
+
+    Every public method mirrors the YARS method of the same name and returns
+    the same result shapes. At most ``max_concurrency`` requests are in
+    flight at once, however many coroutines are awaiting the client, and
+    every attempt draws from ``rate_limiter`` (see YARS).
+    """
+
+    __slots__ = (
+        "proxy",
+        "proxy_pool",
+        "timeout",
+        "random_user_agent",
+        "max_concurrency",
+        "limit_per_host",
+        "keepalive_timeout",
+        "retries",
+        "backoff_factor",
+        "rate_limiter",
+        "json_loads",
+        "models",
+        "prefetch",
+        "seen",
+        "_session",
+        "_semaphore",
+    )
+
+    def __init__(
+        self,
+        proxy=None,
+        timeout=10,
+        random_user_agent=True,
+        max_concurrency=50,
+        limit_per_host=0,
+        keepalive_timeout=30,
+        retries=5,
+        backoff_factor=2,
+        rate_limit=30,
+        rate_window=60,
+        rate_limiter=None,
+        json_backend=None,
+        models=False,
+        prefetch=True,
+        seen=None,
+    ):
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncYARS requires aiohttp, install it with 'pip install aiohttp'"
+            )
+        if isinstance(proxy, (list, tuple)):
+            proxy = ProxyPool(proxy)
+        self.proxy_pool = proxy if isinstance(proxy, ProxyPool) else None
+        self.proxy = None if self.proxy_pool else proxy
+        self.timeout = timeout
+        self.random_user_agent = random_user_agent
+        self.max_concurrency = max_concurrency
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        if rate_limiter is None and rate_limit:
+            rate_limiter = RateLimiter(rate_limit, rate_window)
+        self.rate_limiter = rate_limiter
+        self.json_loads = get_loads(json_backend)
+        self.models = models
+        self.prefetch = prefetch
+        if isinstance(seen, (str, os.PathLike)):
+            seen = SeenSet(seen)
+        self.seen = seen
+        self._session = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_concurrency,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def warm_up(self, connections=None, url=f"{REDDIT_URL}/robots.txt"):
+        """Open keep-alive connections to Reddit ahead of a burst (see YARS)."""
+        connections = connections or min(self.max_concurrency, 10)
+        session = self._get_session()
+
+        async def head():
+            try:
+                async with session.head(url, proxy=self.proxy):
+                    return True
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.info("Warm-up request failed: %s", e)
+                return False
+
+        opened = sum(await asyncio.gather(*(head() for _ in range(connections))))
+        logging.info("Warmed up %d connections to %s", opened, url)
+        return opened
+
+    async def _get_json(self, url, params=None):
+        # aiohttp rejects None values, requests silently drops them
+        if params:
+            params = {k: v for k, v in params.items() if v is not None}
+        headers = {"User-Agent": get_agent()} if self.random_user_agent else None
+
+        async with self._semaphore:
+            # how long a retry may wait for a proxy to leave quarantine
+            pool_wait = 0
+            for attempt in range(self.retries + 1):
+                last_attempt = attempt == self.retries
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire_async()
+                if self.proxy_pool is not None:
+                    delay = min(self.proxy_pool.wait_time(), pool_wait)
+                    pool_wait = 0
+                    if delay:
+                        logging.info("Every proxy is quarantined, waiting %.1fs", delay)
+                        await asyncio.sleep(delay)
+                proxy = self.proxy_pool.choose() if self.proxy_pool else self.proxy
+                start = time.monotonic()
+                try:
+                    async with self._get_session().get(
+                        url, params=params, headers=headers, proxy=proxy
+                    ) as response:
+                        if self.proxy_pool is not None:
+                            latency = time.monotonic() - start
+                            self.proxy_pool.report(
+                                proxy,
+                                latency,
+                                response.status,
+                                retry_after=retry_after(response.headers),
+                            )
+                        elif self.rate_limiter is not None:
+                            self.rate_limiter.update(response.headers)
+                        if response.status not in RETRY_STATUSES or last_attempt:
+                            response.raise_for_status()
+                            return self.json_loads(await response.read())
+
+                        delay = self.backoff_factor * (2**attempt)
+                        if response.status == 429:
+                            delay = retry_after(response.headers) or delay
+                            if self.proxy_pool is not None:
+                                # that proxy is quarantined, the next attempt
+                                # waits up to the backoff for a healthy one
+                                pool_wait, delay = delay, 0
+                            elif self.rate_limiter is not None:
+                                # every task waits out the 429, not just this one
+                                self.rate_limiter.pause(delay)
+                                delay = 0
+                        logging.info(
+                            "Retrying %s after status %d in %.1fs",
+                            url,
+                            response.status,
+                            delay,
+                        )
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if self.proxy_pool is None or last_attempt:
+                        raise
+                    self.proxy_pool.report(proxy, error=True)
+                    logging.info("Request through proxy %s failed: %s", proxy, e)
+                    pool_wait = self.backoff_factor * (2**attempt)
+                    delay = 0
+                if delay:
+                    await asyncio.sleep(delay)
+
+    async def _fetch_page(self, url, params):
+        return (await self._get_json(url, params))["data"]
+
+    async def _iter_listing(
+        self,
+        url,
+        params,
+        description,
+        make_item,
+        limit=None,
+        checkpoint=None,
+        stop=None,
+    ):
+        # see YARS._iter_listing; the next page is prefetched as a task
+        crawl = ListingCrawl(
+            url,
+            params,
+            description,
+            limit,
+            checkpoint,
+            self.seen,
+            self.rate_limiter,
+            stop,
+        )
+        pending = None
+        finished = False
+        try:
+            while crawl.next_params is not None:
+                try:
+                    if pending is not None:
+                        listing = await pending
+                    else:
+                        listing = await self._fetch_page(url, crawl.next_params)
+                except Exception as e:
+                    if crawl.failed(e):
+                        raise
+                    break
+                children = crawl.page(listing)
+                pending = None
+                if crawl.next_params is not None and self.prefetch:
+                    pending = asyncio.ensure_future(
+                        self._fetch_page(url, crawl.next_params)
+                    )
+                for item in crawl.items(children, make_item):
+                    yield item
+            finished = True
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+            crawl.close(finished)
+
+    async def _collect(self, items, checkpoint, model):
+        if checkpoint is None:
+            return [item async for item in items]
+        async for item in items:
+            checkpoint.items.append(item)
+        return checkpoint.collected(model if self.models else None)
+
+    def _iter_search(self, url, params, limit, after, before, fields):
+        params = {**params, "limit": min(100, limit or 100)}
+        if after:
+            params["after"] = after
+        if before:
+            params["before"] = before
+        make_result = search_result_extractor(fields)
+        return self._iter_listing(url, params, "search results", make_result, limit)
+
+    def iter_search(
+        self,
+        query,
+        subreddit=None,
+        limit=10,
+        after=None,
+        before=None,
+        sort="relevance",
+        fields=None,
+    ):
+        params = {"q": query, "sort": sort, "type": "link"}
+        if subreddit:
+            url = f"{REDDIT_URL}/r/{subreddit}/search.json"
+            params["restrict_sr"] = "on"
+        else:
+            url = f"{REDDIT_URL}/search.json"
+        return self._iter_search(url, params, limit, after, before, fields)
+
+    async def handle_search(self, url, params, after=None, before=None, fields=None):
+        limit = params.get("limit", 10)
+        results = [
+            result
+            async for result in self._iter_search(
+                url, params, limit, after, before, fields
+            )
+        ]
+        logging.info("Search Results Returned %d Results", len(results))
+        return results
+
+    async def search_reddit(
+        self, query, limit=10, after=None, before=None, fields=None
+    ):
+        url = f"{REDDIT_URL}/search.json"
+        params = {"q": query, "limit": limit, "sort": "relevance", "type": "link"}
+        return await self.handle_search(url, params, after, before, fields)
+
+    async def search_subreddit(
+        self,
+        subreddit,
+        query,
+        limit=10,
+        after=None,
+        before=None,
+        sort="relevance",
+        fields=None,
+    ):
+        url = f"{REDDIT_URL}/r/{subreddit}/search.json"
+        params = {
+            "q": query,
+            "limit": limit,
+            "sort": sort,
+            "type": "link",
+            "restrict_sr": "on",
+        }
+        return await self.handle_search(url, params, after, before, fields)
+
+    async def _fetch_more_children(self, link_id, children):
+        params = {
+            "api_type": "json",
+            "link_id": link_id,
+            "children": ",".join(children),
+            "limit_children": "false",
+            "raw_json": 1,
+        }
+        try:
+            data = await self._get_json(f"{REDDIT_URL}/api/morechildren.json", params)
+            return data["json"]["data"]["things"]
+        except Exception as e:
+            logging.info("More children request unsuccessful: %s", e)
+            return None
+
+    async def _expand_more_comments(self, post_data):
+        link_id = post_data[0]["data"]["children"][0]["data"]["name"]
+        splicer = CommentSplicer(post_data[1]["data"]["children"])
+        concurrent = True
+        for _ in range(MORE_CHILDREN_ROUNDS):
+            batches = splicer.next_batches()
+            if not batches:
+                break
+            if concurrent:
+                results = await asyncio.gather(
+                    *(self._fetch_more_children(link_id, batch) for batch in batches)
+                )
+            else:
+                results = [
+                    await self._fetch_more_children(link_id, batch) for batch in batches
+                ]
+            for batch, things in zip(batches, results):
+                if things is None:
+                    # Reddit turns down concurrent morechildren calls, so
+                    # retry the failed ids one request at a time
+                    splicer.failed(batch)
+                    concurrent = False
+                else:
+                    splicer.splice(batch, things)
+            logging.info("Expanded %d more-comments batches", len(batches))
+
+        missing = splicer.finish()
+        if missing:
+            logging.info("%d more comments could not be loaded", missing)
+            print(f"Could not load {missing} more comments, their stubs are kept")
+        return missing
+
+    async def scrape_post_details(self, permalink, fields=None, expand_more=False):
+        url = f"{REDDIT_URL}{permalink}.json"
+
+        try:
+            data = await self._get_json(url)
+            if expand_more and isinstance(data, list) and len(data) >= 2:
+                await self._expand_more_comments(data)
+            logging.info("Post details request successful : %s", url)
+        except Exception as e:
+            logging.info("Post details request unsuccessful: %s", e)
+            print(f"Failed to fetch post data: {e}")
+            return None
+
+        post_details = parse_post_details(data, self.models, fields)
+        if post_details is None:
+            logging.info("Unexpected post data structure")
+            print("Unexpected post data structure")
+            return None
+
+        logging.info("Successfully scraped post: %s", post_details["title"])
+        return post_details
+
+    async def iter_post_comments(self, permalink, fields=None, expand_more=False):
+        url = f"{REDDIT_URL}{permalink}.json"
+        try:
+            data = await self._get_json(url)
+            if expand_more:
+                await self._expand_more_comments(data)
+            comments = data[1]["data"]["children"]
+        except Exception as e:
+            logging.info("Post comments request unsuccessful: %s", e)
+            print(f"Failed to fetch post comments: {e}")
+            return
+
+        for comment in iter_comments(comments, self.models, fields):
+            yield comment
+
+    def iter_user_items(self, username, limit=10, fields=None, checkpoint=None):
+        base_url = f"{REDDIT_URL}/user/{username}/.json"
+        params = {"limit": min(100, limit or 100)}
+        make_item = user_item_extractor(fields, self.models)
+        return self._iter_listing(
+            base_url,
+            params,
+            f"data for user {username}",
+            make_item,
+            limit,
+            checkpoint=checkpoint,
+        )
+
+    async def scrape_user_data(self, username, limit=10, fields=None, checkpoint=None):
+        logging.info("Scraping user data for %s, limit: %s", username, limit)
+        if isinstance(checkpoint, (str, os.PathLike)):
+            checkpoint = Checkpoint(checkpoint)
+        items = self.iter_user_items(username, limit, fields, checkpoint)
+        all_items = await self._collect(items, checkpoint, UserItem)
+        logging.info("Successfully scraped user data for %s", username)
+        return all_items
+
+    def iter_subreddit_posts(
+        self,
+        subreddit,
+        limit=10,
+        category="hot",
+        time_filter="all",
+        fields=None,
+        checkpoint=None,
+        since_fullname=None,
+        since_utc=None,
+        use_before=False,
+        max_image_width=None,
+        image_variant=None,
+    ):
+        url = listing_url(subreddit, category)
+        make_post = post_extractor(fields, self.models, max_image_width, image_variant)
+        params = {"limit": min(100, limit or 100), "raw_json": 1, "t": time_filter}
+        if use_before and since_fullname:
+            params["before"] = since_fullname
+            since_fullname = None
+        return self._iter_listing(
+            url,
+            params,
+            f"posts for subreddit/user {subreddit}",
+            make_post,
+            limit,
+            checkpoint=checkpoint,
+            stop=since_predicate(since_fullname, since_utc),
+        )
+
+    async def fetch_subreddit_posts(
+        self,
+        subreddit,
+        limit=10,
+        category="hot",
+        time_filter="all",
+        fields=None,
+        checkpoint=None,
+        since_fullname=None,
+        since_utc=None,
+        use_before=False,
+        max_image_width=None,
+        image_variant=None,
+    ):
+        logging.info(
+            "Fetching subreddit/user posts for %s, limit: %s, category: %s, time_filter: %s",
+            subreddit,
+            limit,
+            category,
+            time_filter,
+        )
+        if isinstance(checkpoint, (str, os.PathLike)):
+            checkpoint = Checkpoint(checkpoint)
+        posts = self.iter_subreddit_posts(
+            subreddit,
+            limit,
+            category,
+            time_filter,
+            fields,
+            checkpoint,
+            since_fullname,
+            since_utc,
+            use_before,
+            max_image_width,
+            image_variant,
+        )
+        all_posts = await self._collect(posts, checkpoint, Post)
+        logging.info("Successfully fetched subreddit posts for %s", subreddit)
+        return all_posts
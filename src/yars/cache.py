@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+import requests
+
+DEFAULT_TTLS = {"listing": 300, "post": 3600, "user": 900}
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of Reddit JSON responses.
+
+    Entries are keyed by URL plus query parameters and stored one file per
+    key. Each endpoint type ("listing", "post", "user") has its own TTL;
+    stale entries keep their ``ETag``/``Last-Modified`` validators so they
+    can be revalidated with a conditional request instead of refetched.
+    """
+
+    def __init__(self, directory=".yars_cache", ttls=None):
+        self.directory = directory
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(url, params=None):
+        query = ""
+        if params:
+            query = urlencode(
+                sorted((k, v) for k, v in params.items() if v is not None)
+            )
+        return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.info("Ignoring unreadable cache entry %s: %s", key, e)
+            return None
+
+    def _write(self, key, entry):
+        path = self._path(key)
+        # a temp file of its own per write: threads may store the same key
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+            json.dump(entry, cache_file)
+        os.replace(tmp_path, path)
+
+    def set(self, key, response):
+        entry = {
+            "url": response.url,
+            "stored_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body": response.text,
+        }
+        self._write(key, entry)
+        return entry
+
+    def touch(self, key, entry):
+        entry["stored_at"] = time.time()
+        self._write(key, entry)
+
+    def is_fresh(self, entry, kind):
+        return time.time() - entry["stored_at"] < self.ttls.get(kind, 0)
+
+    @staticmethod
+    def validators(entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def to_response(entry):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry["url"]
+        response.encoding = "utf-8"
+        response._content = entry["body"].encode("utf-8")
+        return response
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded in-memory LRU with an optional maximum entry age.
+
+    Used to memoize parsed results within one process; hits return the
+    stored object itself, so callers should treat results as read-only.
+    """
+
+    def __init__(self, maxsize=256, max_age=None):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                stored_at, value = item
+                age = time.monotonic() - stored_at
+                if self.max_age is None or age < self.max_age:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
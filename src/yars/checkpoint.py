@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import logging
+import tempfile
+from itertools import islice
+
+from .models import to_dict
+
+
+class Checkpoint:
+    """
+    Progress of a long paginated crawl, kept in a small JSON file.
+
+    The listing iterators save their position (cursor of the current page,
+    offset into it, items counted towards ``limit``) and the rate-limiter
+    state after every page and when they are closed. Running the same call
+    again with the same checkpoint resumes from that position; a finished
+    crawl deletes the file. ``items`` holds what the list-returning methods
+    had collected, so they can return the complete result after a restart.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = None
+        self.items = []
+        try:
+            with open(path, "r", encoding="utf-8") as checkpoint_file:
+                data = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.info("Ignoring unreadable checkpoint %s: %s", path, e)
+            return
+        self.items = data.pop("items", [])
+        self.state = data
+
+    def resume(self, url, params):
+        """
+        Return the saved state if it belongs to a crawl of ``url`` with
+        ``params`` (cursors aside), otherwise forget it and return None.
+        """
+        if self.state is None:
+            return None
+        if self.state.get("url") == url and self.state.get("params") == params:
+            return self.state
+        logging.info("Checkpoint %s is for another crawl, starting over", self.path)
+        self.state = None
+        self.items = []
+        return None
+
+    def save(self, **state):
+        self.state = state
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(
+                {**state, "saved_at": time.time(), "items": to_dict(self.items)},
+                checkpoint_file,
+            )
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Delete the file; ``items`` stays available in memory."""
+        self.state = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def collected(self, model=None):
+        """``items``, with those restored from the file rebuilt as ``model``."""
+        if model is None:
+            return self.items
+        # items restored from the checkpoint file are plain dicts
+        return [
+            model(**item) if isinstance(item, dict) else item for item in self.items
+        ]
+
+
+class ListingCrawl:
+    """
+    Bookkeeping of one crawl through a paginated listing, shared by the
+    sync and async clients so that only fetching the pages differs.
+
+    A ``before`` param pages towards newer items, otherwise ``after`` is
+    followed. ``page`` takes in each fetched page and sets ``next_params``
+    (None once the listing, ``limit`` or a child ``stop`` returns True for
+    is reached); ``items`` then yields ``make_item(child)`` for its
+    children, skipping None results and names already in ``seen`` (both
+    still count towards ``limit``). An item's name goes into ``seen`` once
+    the next one is asked for, and the set is saved after every page.
+
+    With a ``checkpoint`` the position (cursor, offset into the page,
+    items counted) and the rate-limiter state are saved after every page
+    and on ``close``, and a saved position for the same ``url`` and
+    ``params`` is resumed from. A failed request should then be raised
+    rather than end the crawl, leaving the checkpoint to retry from.
+    """
+
+    def __init__(
+        self,
+        url,
+        params,
+        description,
+        limit=None,
+        checkpoint=None,
+        seen=None,
+        rate_limiter=None,
+        stop=None,
+    ):
+        if isinstance(checkpoint, (str, os.PathLike)):
+            checkpoint = Checkpoint(checkpoint)
+        self.url = url
+        self.params = params
+        self.description = description
+        self.limit = limit
+        self.checkpoint = checkpoint
+        self.seen = seen
+        self.rate_limiter = rate_limiter
+        self.stop = stop
+        self.cursor = "before" if params.get("before") else "after"
+        self.page_cursor = params.get(self.cursor)
+        self.count = self.offset = 0
+
+        resumed = checkpoint.resume(url, params) if checkpoint is not None else None
+        if resumed:
+            self.page_cursor = resumed["cursor"] or self.page_cursor
+            self.count = resumed["count"]
+            self.offset = resumed["offset"]
+            if rate_limiter is not None and resumed.get("rate_limiter"):
+                rate_limiter.restore(resumed["rate_limiter"])
+            logging.info("Resuming %s after %d items", description, self.count)
+
+        # the first page fetched is the one the checkpoint stopped in, and
+        # no page is fetched past ``limit`` children from there
+        self.next_params = {**params, self.cursor: self.page_cursor}
+        self._fetch_limit = None if limit is None else limit - self.count + self.offset
+        self._fetched = 0
+        self._next_cursor = None
+
+    def failed(self, error):
+        """Report a failed request; True if it should be raised."""
+        logging.info("Request for %s unsuccessful: %s", self.description, error)
+        print(f"Failed to fetch {self.description}: {error}")
+        self.next_params = None
+        return self.checkpoint is not None
+
+    def page(self, listing):
+        """Take in a fetched page and return the children to go through."""
+        logging.info("Request for %s successful", self.description)
+        children = listing["children"]
+        next_cursor = listing.get(self.cursor)
+        if self.stop is not None:
+            for index, child in enumerate(children):
+                if self.stop(child):
+                    logging.info("Reached seen items of %s", self.description)
+                    children = children[:index]
+                    next_cursor = None
+                    break
+
+        if not children:
+            logging.info("No more items found for %s", self.description)
+            self.next_params = None
+            return children
+        self._fetched += len(children)
+        self._next_cursor = next_cursor
+        more = next_cursor and (
+            self._fetch_limit is None or self._fetched < self._fetch_limit
+        )
+        self.next_params = {**self.params, self.cursor: next_cursor} if more else None
+        return children
+
+    def items(self, children, make_item):
+        if not children:
+            return
+        seen = self.seen
+        for child in islice(children, self.offset, None):
+            if self.limit is not None and self.count >= self.limit:
+                break
+            self.count += 1
+            self.offset += 1
+            if seen is not None:
+                # unkeyable names are never "in" the set, so they pass
+                name = child["data"].get("name", "")
+                if name in seen:
+                    continue
+            item = make_item(child)
+            if item is not None:
+                yield item
+            if seen is not None:
+                # the consumer asked for the next item, so it is done with
+                # this one; an item it stopped at is not marked
+                seen.add(name)
+        self.page_cursor = self._next_cursor
+        self.offset = 0
+        if seen is not None:
+            seen.save()
+        if self.checkpoint is not None:
+            self.save()
+
+    def save(self):
+        limiter = self.rate_limiter
+        self.checkpoint.save(
+            url=self.url,
+            params=self.params,
+            cursor=self.page_cursor,
+            offset=self.offset,
+            count=self.count,
+            rate_limiter=limiter.state() if limiter is not None else None,
+        )
+
+    def close(self, finished):
+        """
+        Persist the seen set, and clear the checkpoint of a ``finished``
+        crawl or save the position of an interrupted one.
+        """
+        if self.seen is not None:
+            self.seen.save()
+        if self.checkpoint is not None:
+            if finished:
+                self.checkpoint.clear()
+            else:
+                self.save()
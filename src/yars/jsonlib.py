@@ -0,0 +1,62 @@
+"""
+Pluggable JSON decoding for Reddit responses.
+
+orjson or msgspec are used automatically when installed; both decode large
+comment threads several times faster than the stdlib ``json`` module, which
+remains the fallback. Every backend raises ValueError on malformed input.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional dependency
+    msgspec = None
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _msgspec_loads():
+    decoder = msgspec.json.Decoder()
+
+    def loads(data):
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    return loads
+
+
+def available_backends():
+    available = {"orjson": orjson, "msgspec": msgspec, "json": json}
+    return [name for name in BACKENDS if available[name] is not None]
+
+
+def get_loads(backend=None):
+    """
+    Return a ``loads(bytes_or_str)`` function for ``backend``.
+
+    ``None`` picks the fastest installed backend; naming one that isn't
+    installed raises ImportError.
+    """
+    if backend is None:
+        backend = available_backends()[0]
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown JSON backend {backend!r}, expected one of {BACKENDS}"
+        )
+    if backend == "orjson":
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        return orjson.loads
+    if backend == "msgspec":
+        if msgspec is None:
+            raise ImportError("msgspec is not installed")
+        return _msgspec_loads()
+    return json.loads
@@ -0,0 +1,99 @@
+"""
+Compact result models, returned instead of dicts when a client is created
+with ``models=True``.
+
+Slotted dataclasses carry no per-instance ``__dict__`` and no repeated key
+strings, so large crawls use a fraction of the memory of the equivalent
+dicts. ``to_dict`` converts any result (model, list or dict of models) back
+to the plain dict shapes YARS returns by default. Fields left out by a
+``fields=`` projection stay None.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field, fields
+from typing import ClassVar
+
+
+@dataclass(slots=True)
+class Post:
+    title: str | None = None
+    author: str | None = None
+    permalink: str | None = None
+    score: int | None = None
+    num_comments: int | None = None
+    created_utc: float | None = None
+    image_url: str | None = None
+    thumbnail_url: str | None = None
+    id: str | None = None
+    name: str | None = None
+    subreddit: str | None = None
+
+    _optional: ClassVar[tuple] = (
+        "image_url",
+        "thumbnail_url",
+        "id",
+        "name",
+        "subreddit",
+    )
+
+    def to_dict(self):
+        return _model_to_dict(self)
+
+
+@dataclass(slots=True)
+class Comment:
+    author: str | None = None
+    body: str | None = None
+    score: int | None = None
+    replies: list[Comment] = field(default_factory=list)
+    id: str | None = None
+    parent_id: str | None = None
+    created_utc: float | None = None
+    depth: int | None = None
+
+    _optional: ClassVar[tuple] = ("id", "parent_id", "created_utc", "depth")
+
+    def to_dict(self):
+        return _model_to_dict(self)
+
+
+@dataclass(slots=True)
+class UserItem:
+    type: str | None = None
+    title: str | None = None
+    subreddit: str | None = None
+    body: str | None = None
+    created_utc: float | None = None
+    url: str | None = None
+    id: str | None = None
+    name: str | None = None
+
+    # posts have no body and comments no title, as in the dict shape
+    _optional: ClassVar[tuple] = ("title", "body", "id", "name")
+
+    def to_dict(self):
+        return _model_to_dict(self)
+
+
+MODELS = (Post, Comment, UserItem)
+
+
+def _model_to_dict(model):
+    result = {}
+    for model_field in fields(model):
+        value = getattr(model, model_field.name)
+        if value is None and model_field.name in model._optional:
+            continue
+        result[model_field.name] = to_dict(value)
+    return result
+
+
+def to_dict(result):
+    """Convert models (possibly nested in lists/dicts) to plain dicts."""
+    if isinstance(result, MODELS):
+        return result.to_dict()
+    if isinstance(result, list):
+        return [to_dict(item) for item in result]
+    if isinstance(result, dict):
+        return {key: to_dict(value) for key, value in result.items()}
+    return result
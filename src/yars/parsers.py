@@ -0,0 +1,563 @@
+"""
+Response parsing shared by the sync and async clients, so both return
+exactly the same result shapes.
+"""
+
+from functools import lru_cache, partial
+from operator import itemgetter
+
+from .models import Comment, Post, UserItem
+
+REDDIT_URL = "https://www.reddit.com"
+
+CATEGORIES = ("hot", "top", "new", "userhot", "usertop", "usernew")
+
+
+def listing_url(subreddit, category):
+    if category not in CATEGORIES:
+        raise ValueError(
+            "Category for Subreddit must be either 'hot', 'top', or 'new' or for User must be 'userhot', 'usertop', or 'usernew'"
+        )
+    if category.startswith("user"):
+        return f"{REDDIT_URL}/user/{subreddit}/submitted/{category[4:]}.json"
+    return f"{REDDIT_URL}/r/{subreddit}/{category}.json"
+
+
+def search_result_extractor(fields=None):
+    if fields is None:
+        return parse_search_result
+    extractor = compile_extractor("search", tuple(fields))
+    return lambda post: extractor(post["data"])
+
+
+def parse_search_result(post):
+    post_data = post["data"]
+    return {
+        "title": post_data["title"],
+        "link": f"{REDDIT_URL}{post_data['permalink']}",
+        "description": post_data.get("selftext", "")[:269],
+    }
+
+
+def parse_post_details(post_data, model=False, fields=None):
+    if not isinstance(post_data, list) or len(post_data) < 2:
+        return None
+
+    main_post = post_data[0]["data"]["children"][0]["data"]
+    return {
+        "title": main_post["title"],
+        "body": main_post.get("selftext", ""),
+        "comments": extract_comments(post_data[1]["data"]["children"], model, fields),
+    }
+
+
+def _next_comment(siblings):
+    for comment in siblings:
+        if isinstance(comment, dict) and comment.get("kind") == "t1":
+            return comment.get("data", {})
+    return None
+
+
+def _reply_children(comment_data):
+    replies = comment_data.get("replies", "")
+    if isinstance(replies, dict):
+        return replies.get("data", {}).get("children", [])
+    return None
+
+
+def extract_comments(comments, model=False, fields=None):
+    """
+    Build the nested comment tree for a post's comment listing.
+
+    The tree is walked with an explicit stack rather than recursion, so
+    arbitrarily deep threads can't hit Python's recursion limit.
+    """
+    extractor = None
+    if fields is not None:
+        extractor = compile_extractor("comment", tuple(fields), model)
+
+    extracted_comments = []
+    # each frame: remaining siblings at one level, list their nodes go into
+    stack = [(iter(comments), extracted_comments)]
+    while stack:
+        siblings, out = stack[-1]
+        comment_data = _next_comment(siblings)
+        if comment_data is None:
+            stack.pop()
+            continue
+
+        if extractor is not None:
+            extracted_comment = extractor(comment_data)
+            if model:
+                replies = extracted_comment.replies
+            else:
+                replies = extracted_comment["replies"] = []
+        elif model:
+            replies = []
+            extracted_comment = Comment(
+                comment_data.get("author", ""),
+                comment_data.get("body", ""),
+                comment_data.get("score", ""),
+                replies,
+            )
+        else:
+            replies = []
+            extracted_comment = {
+                "author": comment_data.get("author", ""),
+                "body": comment_data.get("body", ""),
+                "score": comment_data.get("score", ""),
+                "replies": replies,
+            }
+        out.append(extracted_comment)
+
+        children = _reply_children(comment_data)
+        if children:
+            stack.append((iter(children), replies))
+    return extracted_comments
+
+
+def iter_comments(comments, model=False, fields=None):
+    """
+    Yield every comment of a comment listing one at a time, depth first.
+
+    Items are flat (no ``replies``) and always carry ``id``, ``parent_id``
+    and ``depth`` (0 for top-level comments), so the tree can be rebuilt
+    or stored without holding it in memory.
+    """
+    extractor = None
+    if fields is not None:
+        extractor = compile_extractor("comment", tuple(fields))
+
+    stack = [(iter(comments), 0)]
+    while stack:
+        siblings, depth = stack[-1]
+        comment_data = _next_comment(siblings)
+        if comment_data is None:
+            stack.pop()
+            continue
+
+        if extractor is not None:
+            comment = extractor(comment_data)
+        else:
+            comment = {
+                "author": comment_data.get("author", ""),
+                "body": comment_data.get("body", ""),
+                "score": comment_data.get("score", ""),
+            }
+        comment["id"] = comment_data.get("id")
+        comment["parent_id"] = comment_data.get("parent_id")
+        comment["depth"] = depth
+        yield Comment(**comment) if model else comment
+
+        children = _reply_children(comment_data)
+        if children:
+            stack.append((iter(children), depth + 1))
+
+
+def user_item_extractor(fields=None, model=False):
+    if fields is None:
+        return partial(parse_user_item, model=model)
+    extractor = compile_extractor("user_item", tuple(fields), model)
+    return lambda item: extractor(item) if item["kind"] in ("t1", "t3") else None
+
+
+def parse_user_item(item, model=False):
+    kind = item["kind"]
+    item_data = item["data"]
+    if kind == "t3":
+        if model:
+            return UserItem(
+                type="post",
+                title=item_data.get("title", ""),
+                subreddit=item_data.get("subreddit", ""),
+                url=f"{REDDIT_URL}{item_data.get('permalink', '')}",
+                created_utc=item_data.get("created_utc", ""),
+            )
+        return {
+            "type": "post",
+            "title": item_data.get("title", ""),
+            "subreddit": item_data.get("subreddit", ""),
+            "url": f"{REDDIT_URL}{item_data.get('permalink', '')}",
+            "created_utc": item_data.get("created_utc", ""),
+        }
+    if kind == "t1":
+        if model:
+            return UserItem(
+                type="comment",
+                subreddit=item_data.get("subreddit", ""),
+                body=item_data.get("body", ""),
+                created_utc=item_data.get("created_utc", ""),
+                url=f"{REDDIT_URL}{item_data.get('permalink', '')}",
+            )
+        return {
+            "type": "comment",
+            "subreddit": item_data.get("subreddit", ""),
+            "body": item_data.get("body", ""),
+            "created_utc": item_data.get("created_utc", ""),
+            "url": f"{REDDIT_URL}{item_data.get('permalink', '')}",
+        }
+    return None
+
+
+def post_extractor(fields=None, model=False, max_image_width=None, image_variant=None):
+    image = None
+    if max_image_width is not None or image_variant is not None:
+        image = (max_image_width, image_variant)
+    if fields is None:
+        if image is None:
+            return partial(parse_subreddit_post, model=model)
+        return partial(
+            parse_subreddit_post,
+            model=model,
+            max_image_width=max_image_width,
+            image_variant=image_variant,
+        )
+    extractor = compile_extractor("post", tuple(fields), model, image)
+    return lambda post: extractor(post["data"])
+
+
+def _preview_image(post_data, variant=None):
+    try:
+        image = post_data["preview"]["images"][0]
+    except (KeyError, IndexError, TypeError):
+        return None
+    if variant is not None:
+        # "gif" and "mp4" for animated posts, "obfuscated"/"nsfw" for blurred
+        return image.get("variants", {}).get(variant)
+    return image
+
+
+def pick_resolution(image, max_width=None):
+    """
+    The smallest of a preview image's ``resolutions`` and ``source`` at
+    least ``max_width`` pixels wide, or the widest one if none is.
+    """
+    if max_width is None:
+        return image["source"]
+    candidates = [*image.get("resolutions", ()), image["source"]]
+    wide_enough = [c for c in candidates if c.get("width", 0) >= max_width]
+    if wide_enough:
+        return min(wide_enough, key=lambda c: c.get("width", 0))
+    return max(candidates, key=lambda c: c.get("width", 0))
+
+
+def _image_url(post_data, max_width=None, variant=None):
+    if max_width is not None or variant is not None:
+        # Reddit's downscaled copies of the image live in the preview
+        preview = _preview_image(post_data, variant) or _preview_image(post_data)
+        if preview is not None and "source" in preview:
+            return pick_resolution(preview, max_width)["url"]
+    if post_data.get("post_hint") == "image" and "url" in post_data:
+        return post_data["url"]
+    if "preview" in post_data and "images" in post_data["preview"]:
+        return post_data["preview"]["images"][0]["source"]["url"]
+    return None
+
+
+def _thumbnail_url(post_data):
+    if "thumbnail" in post_data and post_data["thumbnail"] != "self":
+        return post_data["thumbnail"]
+    return None
+
+
+def parse_subreddit_post(post, model=False, max_image_width=None, image_variant=None):
+    post_data = post["data"]
+    image_url = _image_url(post_data, max_image_width, image_variant)
+    thumbnail_url = _thumbnail_url(post_data)
+
+    if model:
+        return Post(
+            post_data["title"],
+            post_data["author"],
+            post_data["permalink"],
+            post_data["score"],
+            post_data["num_comments"],
+            post_data["created_utc"],
+            image_url,
+            thumbnail_url,
+        )
+
+    post_info = {
+        "title": post_data["title"],
+        "author": post_data["author"],
+        "permalink": post_data["permalink"],
+        "score": post_data["score"],
+        "num_comments": post_data["num_comments"],
+        "created_utc": post_data["created_utc"],
+    }
+    if image_url is not None:
+        post_info["image_url"] = image_url
+    if thumbnail_url is not None:
+        post_info["thumbnail_url"] = thumbnail_url
+    return post_info
+
+
+def since_predicate(since_fullname=None, since_utc=None):
+    """
+    Return a predicate telling whether a listing child is at or past the
+    point a newest-first crawl has already seen, or None if neither bound
+    is given. Stickied posts are ignored, they sit out of order at the top.
+    """
+    if since_fullname is None and since_utc is None:
+        return None
+
+    def seen(child):
+        data = child["data"]
+        if data.get("stickied"):
+            return False
+        if since_fullname is not None and data.get("name") == since_fullname:
+            return True
+        created_utc = data.get("created_utc")
+        return (
+            since_utc is not None
+            and created_utc is not None
+            and created_utc <= since_utc
+        )
+
+    return seen
+
+
+# Field tables for fields= projections. A string is a key that is always
+# present in Reddit's data and is fetched with one itemgetter; a callable
+# computes the value, and a None result leaves the field out of dicts.
+POST_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "title": "title",
+    "author": "author",
+    "permalink": "permalink",
+    "score": "score",
+    "num_comments": "num_comments",
+    "created_utc": "created_utc",
+    "subreddit": "subreddit",
+    "image_url": _image_url,
+    "thumbnail_url": _thumbnail_url,
+}
+
+SEARCH_FIELDS = {
+    **POST_FIELDS,
+    "link": lambda data: f"{REDDIT_URL}{data['permalink']}",
+    "description": lambda data: data.get("selftext", "")[:269],
+}
+
+COMMENT_FIELDS = {
+    "id": lambda data: data.get("id"),
+    "parent_id": lambda data: data.get("parent_id"),
+    "author": lambda data: data.get("author", ""),
+    "body": lambda data: data.get("body", ""),
+    "score": lambda data: data.get("score", ""),
+    "created_utc": lambda data: data.get("created_utc"),
+}
+
+USER_ITEM_FIELDS = {
+    "type": lambda item: "post" if item["kind"] == "t3" else "comment",
+    "id": lambda item: item["data"].get("id"),
+    "name": lambda item: item["data"].get("name"),
+    "title": lambda item: (
+        item["data"].get("title", "") if item["kind"] == "t3" else None
+    ),
+    "subreddit": lambda item: item["data"].get("subreddit", ""),
+    "body": lambda item: item["data"].get("body", "") if item["kind"] == "t1" else None,
+    "created_utc": lambda item: item["data"].get("created_utc", ""),
+    "url": lambda item: f"{REDDIT_URL}{item['data'].get('permalink', '')}",
+}
+
+FIELD_TABLES = {
+    "post": (POST_FIELDS, Post),
+    "search": (SEARCH_FIELDS, None),
+    "comment": (COMMENT_FIELDS, Comment),
+    "user_item": (USER_ITEM_FIELDS, UserItem),
+}
+
+
+@lru_cache(maxsize=128)
+def compile_extractor(kind, fields, model=False, image=None):
+    """
+    Build an extractor returning only ``fields`` for one item of ``kind``.
+
+    Extractors are cached per field tuple, so a projection is compiled once
+    and each item then costs one itemgetter call plus the computed fields.
+    ``image`` is a ``(max_width, variant)`` pair for picking ``image_url``.
+    """
+    table, model_class = FIELD_TABLES[kind]
+    if image is not None and "image_url" in table:
+        table = {
+            **table,
+            "image_url": partial(_image_url, max_width=image[0], variant=image[1]),
+        }
+    unknown = [name for name in fields if name not in table]
+    if unknown:
+        raise ValueError(
+            f"Unknown {kind} field(s) {unknown}, expected any of {list(table)}"
+        )
+
+    keys = tuple(name for name in fields if isinstance(table[name], str))
+    computed = tuple(
+        (name, table[name]) for name in fields if not isinstance(table[name], str)
+    )
+    if len(keys) > 1:
+        get_keys = itemgetter(*(table[name] for name in keys))
+    elif keys:
+        key = table[keys[0]]
+        get_keys = lambda data: (data[key],)  # noqa: E731
+    make = model_class if model and model_class is not None else None
+
+    def extract(data):
+        result = dict(zip(keys, get_keys(data))) if keys else {}
+        for name, get in computed:
+            value = get(data)
+            if value is not None:
+                result[name] = value
+        if make is not None:
+            return make(**result)
+        return result
+
+    return extract
+
+
+class _PendingStub:
+    __slots__ = ("stub", "container", "queued", "waiting", "found")
+
+    def __init__(self, stub, container):
+        self.stub = stub
+        self.container = container
+        self.queued = list(stub["data"]["children"])
+        self.waiting = set(self.queued)
+        self.found = {}
+
+
+class CommentSplicer:
+    """
+    Splices comments hidden behind "load more comments" stubs back into a
+    raw comment listing.
+
+    ``next_batches`` hands out the ids of every pending ``more`` stub in
+    batches for ``/api/morechildren``. Each batch then goes back through
+    ``splice`` with the things it returned, or through ``failed`` so its
+    ids are asked for again next round. A stub is replaced by its comments
+    (or they go under their parent comment) only once all of its ids are
+    answered, and ``more`` stubs among them are queued for the next round.
+    ``finish`` places what partially answered stubs got, leaves those stubs
+    with their unanswered ids and returns how many ids that is. "Continue
+    this thread" stubs carry no ids and are left alone.
+    """
+
+    def __init__(self, children):
+        self._index = {}
+        self._pending = []
+        self._owners = {}
+        self._scan(children)
+
+    def _scan(self, children):
+        stack = [children]
+        while stack:
+            container = stack.pop()
+            for node in container:
+                self._register(node, container)
+                if node.get("kind") == "t1":
+                    replies = _reply_children(node.get("data", {}))
+                    if replies:
+                        stack.append(replies)
+
+    def _register(self, node, container):
+        data = node.get("data", {})
+        if node.get("kind") == "t1" and data.get("name"):
+            self._index[data["name"]] = data
+        elif node.get("kind") == "more" and data.get("children"):
+            pending = _PendingStub(node, container)
+            self._pending.append(pending)
+            for child_id in pending.queued:
+                self._owners[child_id] = pending
+
+    def next_batches(self, size=100):
+        ids = []
+        for pending in self._pending:
+            ids.extend(pending.queued)
+            pending.queued = []
+        return [ids[i : i + size] for i in range(0, len(ids), size)]
+
+    def failed(self, batch):
+        """Queue the ids of a batch whose request failed again."""
+        for child_id in batch:
+            self._owners[child_id].queued.append(child_id)
+
+    def splice(self, batch, things):
+        owner = None
+        for thing in things:
+            data = thing.get("data", {})
+            # nested "more" stubs reuse a child's id, so they go with the
+            # comment returned just before them
+            if thing.get("kind") == "t1":
+                child_id = data.get("id")
+                owner = self._owners.get(child_id)
+            if owner is not None:
+                owner.found.setdefault(child_id, []).append(thing)
+
+        answered = []
+        for child_id in batch:
+            pending = self._owners.pop(child_id, None)
+            if pending is None:
+                continue
+            pending.waiting.discard(child_id)
+            if not pending.waiting and pending not in answered:
+                answered.append(pending)
+        for pending in answered:
+            self._pending.remove(pending)
+            self._place(pending)
+
+    def _place(self, pending, keep_stub=False):
+        stub, container = pending.stub, pending.container
+        things = [
+            thing
+            for child_id in stub["data"]["children"]
+            for thing in pending.found.get(child_id, ())
+        ]
+        for thing in things:
+            if thing.get("kind") == "t1":
+                self._register(thing, container)
+
+        direct = []
+        nested = []
+        for thing in things:
+            data = thing.get("data", {})
+            parent = self._index.get(data.get("parent_id"))
+            sibling = data.get("parent_id") == stub["data"].get("parent_id")
+            if sibling or parent is None:
+                direct.append(thing)
+                continue
+            replies = parent.get("replies")
+            if not isinstance(replies, dict):
+                replies = parent["replies"] = {"kind": "Listing", "data": {}}
+            children = replies["data"].setdefault("children", [])
+            children.append(thing)
+            nested.append((thing, children))
+
+        # the stub's direct children take its place, keeping sibling order
+        for position, node in enumerate(container):
+            if node is stub:
+                container[position : position + (not keep_stub)] = direct
+                break
+        for thing in direct:
+            if thing.get("kind") == "more":
+                self._register(thing, container)
+        for thing, children in nested:
+            if thing.get("kind") == "more":
+                self._register(thing, children)
+
+    def finish(self):
+        """
+        Place the comments found for stubs still waiting on ids and return
+        the number of ids (plus those of stubs never asked for) unanswered.
+        """
+        unfinished, self._pending = self._pending, []
+        for pending in unfinished:
+            self._place(pending, keep_stub=True)
+            pending.stub["data"]["children"] = [
+                child_id
+                for child_id in pending.stub["data"]["children"]
+                if child_id in pending.waiting
+            ]
+        missing = sum(len(pending.waiting) for pending in unfinished + self._pending)
+        self._pending = []
+        self._owners = {}
+        return missing
@@ -0,0 +1,110 @@
+import time
+import threading
+
+
+class ProxyStats:
+    __slots__ = (
+        "latency",
+        "error_rate",
+        "requests",
+        "errors",
+        "rate_limited",
+        "consecutive_errors",
+        "in_flight",
+        "quarantined_until",
+    )
+
+    def __init__(self):
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.consecutive_errors = 0
+        self.in_flight = 0
+        self.quarantined_until = 0.0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ProxyPool:
+    """
+    Pool of proxies with per-proxy health tracking.
+
+    ``choose`` hands out the healthiest proxy that is not in quarantine,
+    scored by smoothed latency, smoothed error rate and requests already
+    in flight. Every request must be followed by a ``report``; a 429 or
+    ``max_errors`` consecutive failures put the proxy in quarantine for
+    ``cooldown`` seconds (a 429 for its ``Retry-After`` when given). When
+    every proxy is quarantined, callers may wait up to ``wait_time()``,
+    capped by their own backoff, before taking the one back soonest.
+    """
+
+    def __init__(self, proxies, cooldown=300, max_errors=3, smoothing=0.3):
+        if not proxies:
+            raise ValueError("ProxyPool needs at least one proxy")
+        self.cooldown = cooldown
+        self.max_errors = max_errors
+        self.smoothing = smoothing
+        self._stats = {proxy: ProxyStats() for proxy in proxies}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._stats)
+
+    def _score(self, stats):
+        return (
+            (stats.latency + 0.1) * (1 + 4 * stats.error_rate) * (1 + stats.in_flight)
+        )
+
+    def choose(self):
+        with self._lock:
+            now = time.monotonic()
+            healthy = [
+                (proxy, stats)
+                for proxy, stats in self._stats.items()
+                if stats.quarantined_until <= now
+            ]
+            if healthy:
+                proxy, stats = min(healthy, key=lambda item: self._score(item[1]))
+            else:
+                # everything is cooling down, use whichever comes back first
+                proxy, stats = min(
+                    self._stats.items(), key=lambda item: item[1].quarantined_until
+                )
+            stats.in_flight += 1
+            return proxy
+
+    def wait_time(self):
+        """Seconds until some proxy is out of quarantine, 0 if one is now."""
+        with self._lock:
+            earliest = min(stats.quarantined_until for stats in self._stats.values())
+            return max(0.0, earliest - time.monotonic())
+
+    def report(self, proxy, latency=None, status=None, error=False, retry_after=None):
+        with self._lock:
+            stats = self._stats[proxy]
+            stats.in_flight = max(0, stats.in_flight - 1)
+            stats.requests += 1
+            failed = error or (status is not None and (status == 429 or status >= 500))
+            stats.error_rate += self.smoothing * (failed - stats.error_rate)
+            if latency is not None and not error:
+                stats.latency += self.smoothing * (latency - stats.latency)
+
+            if not failed:
+                stats.consecutive_errors = 0
+                return
+            stats.errors += 1
+            stats.consecutive_errors += 1
+            if status == 429:
+                stats.rate_limited += 1
+            if status == 429 and retry_after is not None:
+                stats.quarantined_until = time.monotonic() + retry_after
+            elif status == 429 or stats.consecutive_errors >= self.max_errors:
+                stats.quarantined_until = time.monotonic() + self.cooldown
+                stats.consecutive_errors = 0
+
+    def stats(self):
+        with self._lock:
+            return {proxy: stats.as_dict() for proxy, stats in self._stats.items()}
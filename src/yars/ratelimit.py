@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(headers):
+    """Return the ``Retry-After`` delay in seconds, or None if absent."""
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    seconds = _to_float(value)
+    if seconds is None:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, seconds)
+
+
+class RateLimiter:
+    """
+    Token bucket allowing ``requests`` requests per ``window`` seconds.
+
+    A single limiter can be shared by several threads, asyncio tasks and
+    client instances: callers reserve a token under a lock and then wait
+    (``acquire``) or await (``acquire_async``) until their slot comes up,
+    so waiters are served in arrival order without polling.
+
+    ``update`` adapts the bucket to Reddit's ``x-ratelimit-*`` and
+    ``Retry-After`` response headers, so the configured budget is only the
+    starting point.
+    """
+
+    def __init__(self, requests=30, window=60.0, burst=None):
+        if requests <= 0 or window <= 0:
+            raise ValueError("requests and window must be positive")
+        self.rate = requests / window
+        self.capacity = burst if burst is not None else requests
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def _reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            delay = max(0.0, self._paused_until - now)
+            if self._tokens < 0:
+                delay += -self._tokens / self.rate
+            return delay
+
+    def _paused_for(self):
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def acquire(self):
+        delay = self._reserve()
+        # a pause issued while we slept (e.g. a 429 elsewhere) extends the wait
+        while delay > 0:
+            time.sleep(delay)
+            delay = self._paused_for()
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._paused_for()
+
+    def pause(self, seconds):
+        """Hold back every caller for ``seconds``."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 1.0)
+            self._paused_until = max(self._paused_until, now + seconds)
+
+    def state(self):
+        """Snapshot of the bucket that ``restore`` can apply in a later process."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "tokens": self._tokens,
+                "paused_for": self._paused_for(),
+                "saved_at": time.time(),
+            }
+
+    def restore(self, state):
+        """Resume from ``state``, crediting the time elapsed since it was taken."""
+        elapsed = max(0.0, time.time() - state["saved_at"])
+        with self._lock:
+            now = time.monotonic()
+            self.rate = state["rate"]
+            self._tokens = min(self.capacity, state["tokens"] + elapsed * self.rate)
+            self._updated = now
+            paused_for = state["paused_for"] - elapsed
+            self._paused_until = max(self._paused_until, now + paused_for)
+
+    def update(self, headers):
+        """Adapt pacing to the rate-limit headers of a response."""
+        delay = retry_after(headers)
+        if delay is not None:
+            self.pause(delay)
+            return
+
+        remaining = _to_float(headers.get("x-ratelimit-remaining"))
+        reset = _to_float(headers.get("x-ratelimit-reset"))
+        if remaining is None or reset is None:
+            return
+        if remaining < 1:
+            self.pause(reset)
+            return
+
+        # spread what is left of the server's window evenly over its remainder
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = remaining / max(reset, 1.0)
+            self._tokens = min(self._tokens, remaining)
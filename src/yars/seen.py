@@ -0,0 +1,106 @@
+import os
+import logging
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+
+# Reddit ids are base 36 counters per kind (t1 comments, t3 posts, ...);
+# the kind goes in the top byte so both fit in one int64.
+KIND_SHIFT = 56
+
+
+def id_key(fullname, default_kind=3):
+    """
+    Pack a fullname ("t3_abc123") or bare base-36 id into an int64, or
+    return None if it isn't a Reddit id.
+    """
+    kind, _, base36 = fullname.rpartition("_")
+    try:
+        kind = int(kind[1:]) if kind else default_kind
+        value = int(base36, 36)
+    except ValueError:
+        return None
+    if not 0 <= value < 1 << KIND_SHIFT or not 0 <= kind < 128:
+        return None
+    return kind << KIND_SHIFT | value
+
+
+class SeenSet:
+    """
+    Set of Reddit fullnames already processed, 8 bytes per id.
+
+    Ids live in a sorted int64 array searched by bisection, plus a small
+    set of recent additions merged into it in batches. With a ``path`` the
+    array is loaded from and saved to a raw int64 file.
+    """
+
+    def __init__(self, path=None, merge_size=4096):
+        self.path = path
+        self.merge_size = merge_size
+        self._ids = array("q")
+        self._recent = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, "rb") as seen_file:
+                self._ids.frombytes(seen_file.read())
+            logging.info("Loaded %d seen ids from %s", len(self._ids), path)
+
+    def __len__(self):
+        return len(self._ids) + len(self._recent)
+
+    def _contains(self, key):
+        if key in self._recent:
+            return True
+        index = bisect_left(self._ids, key)
+        return index < len(self._ids) and self._ids[index] == key
+
+    def __contains__(self, fullname):
+        key = id_key(fullname)
+        if key is None:
+            return False
+        with self._lock:
+            return self._contains(key)
+
+    def _merge(self):
+        if self._recent:
+            self._ids = array("q", sorted([*self._ids, *self._recent]))
+            self._recent.clear()
+
+    def add(self, fullname):
+        """
+        Add ``fullname``; returns False if it was already in the set or is
+        not a Reddit id (and so can't be stored).
+        """
+        key = id_key(fullname)
+        if key is None:
+            return False
+        with self._lock:
+            if self._contains(key):
+                return False
+            self._recent.add(key)
+            self._dirty = True
+            if len(self._recent) >= max(self.merge_size, len(self._ids) // 8):
+                self._merge()
+            return True
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            self._merge()
+            if path is None or (not self._dirty and path == self.path):
+                return
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+            )
+            with os.fdopen(fd, "wb") as seen_file:
+                seen_file.write(self._ids.tobytes())
+            os.replace(tmp_path, path)
+            self._dirty = False
+
+    def clear(self):
+        with self._lock:
+            self._ids = array("q")
+            self._recent.clear()
+            self._dirty = True
@@ -9,7 +9,14 @@ class RandomUserAgentSession(Session):
     a random user agent with each request
     """
 
-    def request(self, *args, **kwargs):
-        self.headers.update({"User-Agent": get_agent()})
+    def request(self, method, url, *args, **kwargs):
+        # per-request headers keep the shared session safe to use from threads
+        if len(args) > 2:
+            # params, data, headers, ... were passed positionally
+            headers = {**(args[2] or {}), "User-Agent": get_agent()}
+            args = (*args[:2], headers, *args[3:])
+        else:
+            headers = kwargs.get("headers") or {}
+            kwargs["headers"] = {**headers, "User-Agent": get_agent()}
 
-        return super().request(*args, **kwargs)
+        return super().request(method, url, *args, **kwargs)
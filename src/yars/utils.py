@@ -1,10 +1,27 @@
 import os
 import csv
 import json
+import time
+import hashlib
+import sqlite3
 import logging
+import tempfile
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
+from urllib3.util.retry import Retry
+from requests.adapters import HTTPAdapter
 from pygments import formatters, highlight, lexers
+from .models import to_dict
+from .jsonlib import get_loads
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
 
 logging.basicConfig(
     level=logging.INFO, filename="YARS.log", format="%(asctime)s - %(message)s"
@@ -15,6 +32,7 @@ def display_results(results, title):
 
     try:
         print(f"\n{'-'*20} {title} {'-'*20}")
+        results = to_dict(results)
 
         if isinstance(results, list):
             for item in results:
@@ -46,6 +64,158 @@ def display_results(results, title):
         print("Error displaying results.")
 
 
+_download_session = None
+_download_session_lock = threading.Lock()
+
+
+def get_download_session(pool_maxsize=16):
+    """
+    Session shared by all downloads, so connections to the media hosts are
+    reused across calls and threads instead of opened per image.
+    """
+    global _download_session
+    with _download_session_lock:
+        if _download_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=pool_maxsize,
+                max_retries=Retry(
+                    total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504]
+                ),
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _download_session = session
+        return _download_session
+
+
+def _content_range(response):
+    """(first byte, total size) from a 206 response's Content-Range."""
+    try:
+        _, _, spec = response.headers["Content-Range"].partition(" ")
+        byte_range, _, total = spec.partition("/")
+        return int(byte_range.partition("-")[0]), int(total)
+    except (KeyError, ValueError):
+        return None, None
+
+
+def _range_validator(headers):
+    """The strong ETag, else the Last-Modified, of a response for If-Range."""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def _discard_part(part_path):
+    for stale in (part_path, f"{part_path}.validator"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+def _download_to(
+    session, url, path, headers=None, timeout=30, attempts=3, validator=None
+):
+    """
+    Download ``url`` to ``path`` through ``path.part``, resuming the
+    partial file with a Range request after a dropped connection (or an
+    earlier interrupted run), checking the final size against what the
+    server announced and renaming it into place only when complete.
+
+    Resuming always sends If-Range, so a changed file comes back whole
+    instead of being appended to. Its value is the validator of the
+    response the partial file came from, kept next to it in
+    ``path.part.validator``, or else ``validator`` (the ETag or
+    Last-Modified seen for ``url`` before); a partial file with neither
+    is started over.
+
+    Returns the last response; a 304 leaves ``path`` untouched.
+    """
+    part_path = f"{path}.part"
+    validator_path = f"{part_path}.validator"
+    try:
+        with open(validator_path, "r", encoding="utf-8") as validator_file:
+            validator = validator_file.read().strip() or validator
+    except OSError:
+        pass
+    # byte offsets only line up if the body isn't re-encoded in transit
+    headers = {**(headers or {}), "Accept-Encoding": "identity"}
+    for attempt in range(1, attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset and not validator:
+            # nothing to tell whether the partial file is still current
+            _discard_part(part_path)
+            offset = 0
+        request_headers = dict(headers)
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+            # the server sends the whole file instead if it has changed
+            request_headers["If-Range"] = validator
+        response = session.get(
+            url, headers=request_headers, stream=True, timeout=timeout
+        )
+        # stream=True holds the connection until the response is closed
+        with response:
+            if response.status_code == 304:
+                return response
+            if response.status_code == 416:
+                # the partial file is not a prefix of the current one
+                _discard_part(part_path)
+                continue
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                start, total = _content_range(response)
+                if start != offset:
+                    _discard_part(part_path)
+                    continue
+                mode = "ab"
+            else:
+                length = response.headers.get("Content-Length")
+                total = int(length) if length and length.isdigit() else None
+                mode = "wb"
+                validator = _range_validator(response.headers)
+                if validator:
+                    with open(validator_path, "w", encoding="utf-8") as validator_file:
+                        validator_file.write(validator)
+                elif os.path.exists(validator_path):
+                    os.remove(validator_path)
+
+            try:
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(65536):
+                        f.write(chunk)
+            except requests.RequestException as e:
+                logging.info(
+                    "Download of %s interrupted (%d/%d): %s", url, attempt, attempts, e
+                )
+                continue
+
+            size = os.path.getsize(part_path)
+            if total is not None and size < total:
+                logging.info(
+                    "Download of %s incomplete: %d of %d bytes", url, size, total
+                )
+                continue
+            if total is not None and size > total:
+                _discard_part(part_path)
+                raise ValueError(f"{url}: got {size} bytes, expected {total}")
+            os.replace(part_path, path)
+            if os.path.exists(validator_path):
+                os.remove(validator_path)
+            return response
+    raise requests.ConnectionError(f"{url}: incomplete after {attempts} attempts")
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def download_image(image_url, output_folder="images", session=None):
 
     os.makedirs(output_folder, exist_ok=True)
@@ -54,14 +224,10 @@ def download_image(image_url, output_folder="images", session=None):
     filepath = os.path.join(output_folder, filename)
 
     if session is None:
-        session = requests.Session()
+        session = get_download_session()
 
     try:
-        response = session.get(image_url, stream=True)
-        response.raise_for_status()
-        with open(filepath, "wb") as f:
-            for chunk in response.iter_content(8192):
-                f.write(chunk)
+        _download_to(session, image_url, filepath)
         logging.info("Downloaded: %s", filepath)
         return filepath
     except requests.RequestException as e:
@@ -72,22 +238,703 @@ def download_image(image_url, output_folder="images", session=None):
         return None
 
 
+class _DownloadIndex:
+    """
+    What download_images already fetched into a folder: the file, ETag,
+    Last-Modified and SHA-256 of every URL, and the file holding each
+    distinct content hash. Kept in ``.yars_downloads.json`` in the folder.
+
+    Every URL keeps a ``path`` of its own, which no other URL writes to. A
+    URL whose content turned out to be in another file has its own file
+    removed and that file recorded as ``duplicate_of``.
+    """
+
+    def __init__(self, folder):
+        self.path = os.path.join(folder, ".yars_downloads.json")
+        self.folder = folder
+        try:
+            with open(self.path, "r", encoding="utf-8") as index_file:
+                data = json.load(index_file)
+        except (OSError, ValueError):
+            data = {}
+        self.urls = data.get("urls", {})
+        self.hashes = data.get("hashes", {})
+        self._owners = {entry["path"]: url for url, entry in self.urls.items()}
+        self._lock = threading.Lock()
+
+    def path_for(self, url):
+        """A file of its own for ``url``, even if its basename is taken."""
+        if url in self.urls:
+            return self.urls[url]["path"]
+        url_hash = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        name = os.path.basename(urlparse(url).path) or url_hash
+        path = os.path.join(self.folder, name)
+        if self._owners.get(path, url) != url:
+            root, ext = os.path.splitext(name)
+            path = os.path.join(self.folder, f"{root}-{url_hash}{ext}")
+        self._owners[path] = url
+        return path
+
+    def claim(self, digest, path, previous=None):
+        """
+        Register ``path`` as holding ``digest`` instead of ``previous``;
+        return the earlier file holding ``digest`` if any.
+        """
+        with self._lock:
+            if previous != digest and self.hashes.get(previous) == path:
+                # duplicates of the old content must not point here any more
+                del self.hashes[previous]
+            existing = self.hashes.get(digest)
+            if existing and existing != path and os.path.exists(existing):
+                return existing
+            self.hashes[digest] = path
+            return None
+
+    def record(self, url, **entry):
+        with self._lock:
+            self.urls[url] = {**self.urls.get(url, {}), **entry}
+
+    def save(self):
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as index_file:
+                json.dump({"urls": self.urls, "hashes": self.hashes}, index_file)
+            os.replace(tmp_path, self.path)
+
+
+def _download_one(session, index, url, path, timeout):
+    result = {"url": url, "path": path, "status": "downloaded", "error": None}
+    entry = index.urls.get(url, {})
+    # a duplicate's content is in another URL's file, valid for as long as
+    # that file is still registered with the same hash
+    stored = path if os.path.exists(path) else entry.get("duplicate_of")
+    if stored != path and index.hashes.get(entry.get("sha256")) != stored:
+        stored = None
+    headers = {}
+    try:
+        if stored:
+            if entry.get("etag") or entry.get("last_modified"):
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+            elif stored == path:
+                head = session.head(url, timeout=timeout, allow_redirects=True)
+                length = head.headers.get("Content-Length")
+                if head.ok and length and int(length) == os.path.getsize(path):
+                    index.record(url, path=path, etag=head.headers.get("ETag"))
+                    result["status"] = "exists"
+                    return result
+
+        response = _download_to(
+            session,
+            url,
+            path,
+            headers,
+            timeout,
+            validator=_range_validator(
+                {"ETag": entry.get("etag"), "Last-Modified": entry.get("last_modified")}
+            ),
+        )
+        if response.status_code == 304:
+            if stored == path:
+                result["status"] = "exists"
+            else:
+                result.update(status="duplicate", path=stored)
+            return result
+
+        digest = _file_sha256(path)
+        duplicate = index.claim(digest, path, entry.get("sha256"))
+        if duplicate:
+            os.remove(path)
+            result.update(status="duplicate", path=duplicate)
+        index.record(
+            url,
+            path=path,
+            duplicate_of=duplicate,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            sha256=digest,
+        )
+        logging.info("Downloaded: %s -> %s (%s)", url, result["path"], result["status"])
+    except (requests.RequestException, OSError, ValueError) as e:
+        logging.error("Failed to download %s: %s", url, e)
+        result.update(status="failed", error=str(e))
+    return result
+
+
+def download_images(
+    image_urls, output_folder="images", max_workers=8, session=None, timeout=30
+):
+    """
+    Download many images concurrently on one shared session and return a
+    result per distinct URL, in input order: ``{"url", "path", "status",
+    "error"}`` with status "downloaded", "exists", "duplicate" or "failed".
+
+    Files downloaded before are skipped through a conditional GET on their
+    ETag/Last-Modified, or without any GET if a HEAD reports the size they
+    have on disk. Files whose content matches one already in the folder are
+    not kept, their result points to the existing file. URLs sharing a
+    basename get distinct file names.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    if session is None:
+        session = get_download_session(max_workers)
+    index = _DownloadIndex(output_folder)
+    jobs = [(url, index.path_for(url)) for url in dict.fromkeys(image_urls) if url]
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(
+                executor.map(
+                    lambda job: _download_one(session, index, *job, timeout), jobs
+                )
+            )
+    finally:
+        index.save()
+
+
 def export_to_json(data, filename="output.json"):
     try:
         with open(filename, "w", encoding="utf-8") as json_file:
-            json.dump(data, json_file, indent=4)
+            json.dump(to_dict(data), json_file, indent=4)
         print(f"Data successfully exported to {filename}")
     except Exception as e:
         print(f"Error exporting to JSON: {e}")
 
 
+def _ndjson_part(filename, index):
+    if index == 0:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{index}{ext}"
+
+
+def ndjson_parts(filename):
+    """Paths of ``filename`` and the files it was rotated into, in order."""
+    parts = []
+    while os.path.exists(_ndjson_part(filename, len(parts))):
+        parts.append(_ndjson_part(filename, len(parts)))
+    return parts
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as ndjson_file:
+        ndjson_file.seek(-1, os.SEEK_END)
+        return ndjson_file.read(1) == b"\n"
+
+
+class NDJSONWriter:
+    """
+    Append results to a file as newline-delimited JSON, one compact record
+    per line, so each write costs the size of the record rather than of
+    everything exported so far.
+
+    Buffered records are flushed at most ``flush_interval`` seconds apart
+    and on close. With ``max_bytes``, once a file reaches that size writing
+    moves on to ``name.1.ndjson``, ``name.2.ndjson`` and so on. Reopening
+    appends to the last file.
+    """
+
+    def __init__(self, filename="output.ndjson", flush_interval=1.0, max_bytes=None):
+        self.filename = filename
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.records = 0
+        self._index = max(len(ndjson_parts(filename)) - 1, 0)
+        self._file = None
+        self._open()
+
+    def _open(self):
+        path = _ndjson_part(self.filename, self._index)
+        self._file = open(path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._flushed_at = time.monotonic()
+        if self._size and not _ends_with_newline(path):
+            # end a record truncated by a crash so the next one starts clean
+            self._file.write("\n")
+            self._size += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, item):
+        line = json.dumps(to_dict(item), ensure_ascii=False, separators=(",", ":"))
+        size = len(line.encode("utf-8")) + 1
+        if self.max_bytes and self._size and self._size + size > self.max_bytes:
+            self._file.close()
+            self._index += 1
+            self._open()
+        self._file.write(line + "\n")
+        self._size += size
+        self.records += 1
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def write_many(self, items):
+        for item in items:
+            self.write(item)
+
+    def flush(self):
+        self._file.flush()
+        self._flushed_at = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def iter_ndjson(filename, json_backend=None):
+    """
+    Stream the records of an NDJSON export, including its rotated files,
+    one at a time. A truncated last line (from a crash mid-write) is
+    skipped.
+    """
+    loads = get_loads(json_backend)
+    for path in ndjson_parts(filename):
+        with open(path, "r", encoding="utf-8") as ndjson_file:
+            for line_number, line in enumerate(ndjson_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield loads(line)
+                except ValueError as e:
+                    logging.info("Skipping bad record %s:%d: %s", path, line_number, e)
+
+
 def export_to_csv(data, filename="output.csv"):
     try:
-        keys = data[0].keys()
+        data = to_dict(data)
+        # rows differ in optional fields (image_url, thumbnail_url, ...)
+        keys = list(dict.fromkeys(key for row in data for key in row))
         with open(filename, "w", newline="", encoding="utf-8") as output_file:
             dict_writer = csv.DictWriter(output_file, fieldnames=keys)
             dict_writer.writeheader()
             dict_writer.writerows(data)
         print(f"Data successfully exported to {filename}")
     except Exception as e:
-        print(f"Error exporting to CSV: {e}")
\ No newline at end of file
+        print(f"Error exporting to CSV: {e}")
+
+
+def stream_to_csv(items, filename="output.csv", fieldnames=None, comments=False):
+    """
+    Write ``items`` from any iterable to CSV in constant memory and return
+    the number of rows written.
+
+    With ``fieldnames`` the schema is fixed up front and other keys are
+    dropped; a file left incomplete by an error is removed. Otherwise columns are added as new keys appear, in a single
+    pass over ``items``: rows go to a temporary file first and are copied
+    under the complete header at the end. ``comments=True`` flattens
+    comment trees into one row per comment with ``parent_id`` and
+    ``depth``; the comments need their ``id`` (see ``iter_post_comments``)
+    and one without it raises ValueError.
+    """
+    rows = _flatten_comments(items) if comments else map(to_dict, items)
+    count = 0
+    if fieldnames is not None:
+        try:
+            with open(filename, "w", newline="", encoding="utf-8") as output_file:
+                dict_writer = csv.DictWriter(
+                    output_file, fieldnames=fieldnames, extrasaction="ignore"
+                )
+                dict_writer.writeheader()
+                for row in rows:
+                    dict_writer.writerow(row)
+                    count += 1
+        except BaseException:
+            os.remove(filename)
+            raise
+        return count
+
+    columns = {}
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as tmp_file:
+            writer = csv.writer(tmp_file)
+            for row in rows:
+                for key in row:
+                    columns.setdefault(key, len(columns))
+                writer.writerow([row.get(column, "") for column in columns])
+                count += 1
+
+        width = len(columns)
+        with open(tmp_path, "r", newline="", encoding="utf-8") as tmp_file, open(
+            filename, "w", newline="", encoding="utf-8"
+        ) as output_file:
+            writer = csv.writer(output_file)
+            writer.writerow(columns)
+            for record in csv.reader(tmp_file):
+                writer.writerow(record + [""] * (width - len(record)))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+POST_COLUMNS = (
+    "id",
+    "name",
+    "subreddit",
+    "title",
+    "author",
+    "permalink",
+    "score",
+    "num_comments",
+    "created_utc",
+    "image_url",
+    "thumbnail_url",
+    "body",
+)
+COMMENT_COLUMNS = (
+    "id",
+    "post_id",
+    "parent_id",
+    "author",
+    "body",
+    "score",
+    "created_utc",
+    "depth",
+)
+USER_ITEM_COLUMNS = (
+    "id",
+    "username",
+    "type",
+    "title",
+    "subreddit",
+    "body",
+    "created_utc",
+    "url",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    subreddit TEXT,
+    title TEXT,
+    author TEXT,
+    permalink TEXT,
+    score INTEGER,
+    num_comments INTEGER,
+    created_utc REAL,
+    image_url TEXT,
+    thumbnail_url TEXT,
+    body TEXT
+);
+CREATE TABLE IF NOT EXISTS comments (
+    id TEXT PRIMARY KEY,
+    post_id TEXT,
+    parent_id TEXT,
+    author TEXT,
+    body TEXT,
+    score INTEGER,
+    created_utc REAL,
+    depth INTEGER
+);
+CREATE INDEX IF NOT EXISTS comments_post_id ON comments (post_id);
+CREATE TABLE IF NOT EXISTS user_items (
+    id TEXT PRIMARY KEY,
+    username TEXT,
+    type TEXT,
+    title TEXT,
+    subreddit TEXT,
+    body TEXT,
+    created_utc REAL,
+    url TEXT
+);
+CREATE INDEX IF NOT EXISTS user_items_username ON user_items (username);
+"""
+
+
+def _permalink_parts(permalink):
+    """Split ``/r/<sub>/comments/<post id>/<slug>/[<comment id>]`` (or a URL)."""
+    parts = urlparse(permalink or "").path.strip("/").split("/")
+    subreddit = parts[1] if len(parts) > 1 and parts[0] == "r" else None
+    if "comments" not in parts:
+        return subreddit, None, None
+    ids = parts[parts.index("comments") + 1 :]
+    post_id = ids[0] if ids else None
+    comment_id = ids[2] if len(ids) > 2 else None
+    return subreddit, post_id, comment_id
+
+
+def _reddit_id(item):
+    if item.get("id"):
+        return item["id"]
+    if item.get("name"):
+        return item["name"].partition("_")[2]
+    _, post_id, comment_id = _permalink_parts(item.get("permalink") or item.get("url"))
+    return comment_id or post_id
+
+
+def _flatten_comments(comments, parent_id=None):
+    """
+    Yield one dict per comment, depth first, with ``parent_id`` and
+    ``depth`` filled in from the nesting and ``replies`` dropped. Flat
+    records (``iter_post_comments``) pass through unchanged.
+
+    Comments need their ``id``, which the default ``scrape_post_details``
+    output leaves out; a comment without one raises ValueError.
+    """
+    for top_level in comments:
+        stack = [(to_dict(top_level), parent_id, 0)]
+        while stack:
+            comment, comment_parent, depth = stack.pop()
+            if not comment.get("id"):
+                raise ValueError(
+                    "Comment without an id, scrape comments with "
+                    "iter_post_comments or fields= including 'id'"
+                )
+            replies = comment.get("replies") or []
+            row = {key: value for key, value in comment.items() if key != "replies"}
+            if row.get("parent_id") is None:
+                row["parent_id"] = comment_parent
+            row.setdefault("depth", depth)
+            yield row
+            own_id = f"t1_{row['id']}"
+            stack.extend((reply, own_id, depth + 1) for reply in reversed(replies))
+
+
+class SQLiteSink:
+    """
+    Store scraped posts, comments and user items in a SQLite database.
+
+    Rows are queued and written ``batch_size`` at a time in one transaction
+    each, as upserts on the Reddit id: a row written again updates the
+    stored one, and columns missing from the new row keep their stored
+    value. The database runs in WAL mode so readers don't block the crawl.
+    Ids missing from results are recovered from permalinks where possible,
+    items whose id can't be are skipped. Comments need the ``id`` field
+    (``iter_post_comments`` or ``fields=``), adding ones without it raises
+    ValueError before any of them is queued.
+    """
+
+    TABLES = {
+        "posts": POST_COLUMNS,
+        "comments": COMMENT_COLUMNS,
+        "user_items": USER_ITEM_COLUMNS,
+    }
+
+    def __init__(self, path="yars.db", batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._statements = {
+            table: self._upsert_statement(table, columns)
+            for table, columns in self.TABLES.items()
+        }
+        self._pending = {table: [] for table in self.TABLES}
+        self._queued = 0
+
+    @staticmethod
+    def _upsert_statement(table, columns):
+        updates = ", ".join(
+            f"{column} = COALESCE(excluded.{column}, {table}.{column})"
+            for column in columns[1:]
+        )
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _queue(self, table, row):
+        self._pending[table].append(tuple(row.get(c) for c in self.TABLES[table]))
+        self._queued += 1
+        if self._queued >= self.batch_size:
+            self.flush()
+
+    def add_posts(self, posts):
+        for post in posts:
+            post = to_dict(post)
+            subreddit, _, _ = _permalink_parts(post.get("permalink"))
+            row = {**post, "id": _reddit_id(post)}
+            row.setdefault("subreddit", subreddit)
+            if row["id"] is None:
+                logging.info("Skipping post without an id: %s", post.get("title"))
+                continue
+            self._queue("posts", row)
+
+    def add_post_details(self, permalink, details):
+        """
+        Store the body and comments ``scrape_post_details`` returned, which
+        must have been called with ``fields=`` including comment ``id``.
+        """
+        details = to_dict(details)
+        subreddit, post_id, _ = _permalink_parts(permalink)
+        if post_id is None:
+            logging.info("Skipping post details without an id: %s", permalink)
+            return
+        comments = list(_flatten_comments(details.get("comments", []), f"t3_{post_id}"))
+        post = {
+            "id": post_id,
+            "subreddit": subreddit,
+            "permalink": permalink,
+            "title": details.get("title"),
+            "body": details.get("body"),
+        }
+        self._queue("posts", post)
+        self._queue_comments(comments, post_id)
+
+    def add_comments(self, comments, post_id):
+        """Store nested or flat (``iter_post_comments``) comments of a post."""
+        self._queue_comments(
+            list(_flatten_comments(comments, f"t3_{post_id}")), post_id
+        )
+
+    def _queue_comments(self, rows, post_id):
+        for row in rows:
+            self._queue("comments", {**row, "post_id": post_id})
+
+    def add_user_items(self, items, username=None):
+        for item in items:
+            item = to_dict(item)
+            row = {**item, "id": _reddit_id(item), "username": username}
+            if row["id"] is None:
+                logging.info("Skipping user item without an id: %s", item.get("url"))
+                continue
+            self._queue("user_items", row)
+
+    def flush(self):
+        with self.connection:
+            for table, rows in self._pending.items():
+                if rows:
+                    self.connection.executemany(self._statements[table], rows)
+                    rows.clear()
+        self._queued = 0
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+COLUMNAR_KINDS = {
+    "posts": POST_COLUMNS,
+    "comments": COMMENT_COLUMNS,
+    "user_items": USER_ITEM_COLUMNS,
+}
+NUMERIC_COLUMNS = {
+    "score": "int64",
+    "num_comments": "int64",
+    "depth": "int32",
+    "created_utc": "float64",
+}
+
+
+def _number(value):
+    # Reddit sends "" or None where a number is missing
+    return value if isinstance(value, (int, float)) and value is not True else None
+
+
+class ColumnarWriter:
+    """
+    Write posts, comments or user items (``kind``) to a Parquet file, or an
+    Arrow IPC file if ``filename`` ends in ``.arrow``, ``.feather`` or
+    ``.ipc``. Requires pyarrow.
+
+    Rows are buffered and written as one row group (or record batch) every
+    ``row_group_size`` items, so feeding it from the streaming iterators
+    keeps memory bounded. Comment trees are flattened into one row each
+    with ``parent_id`` and ``depth``; every comment needs its ``id``, see
+    ``iter_post_comments``. Keyword arguments to ``write`` fill
+    columns the items lack, such as ``post_id`` or ``username``.
+    """
+
+    def __init__(self, filename, kind="posts", row_group_size=10_000):
+        if pyarrow is None:
+            raise ImportError(
+                "ColumnarWriter requires pyarrow, install it with 'pip install pyarrow'"
+            )
+        if kind not in COLUMNAR_KINDS:
+            raise ValueError(
+                f"Unknown kind {kind!r}, expected one of {tuple(COLUMNAR_KINDS)}"
+            )
+        self.filename = filename
+        self.kind = kind
+        self.row_group_size = row_group_size
+        self.columns = COLUMNAR_KINDS[kind]
+        self.schema = pyarrow.schema(
+            (column, NUMERIC_COLUMNS.get(column, pyarrow.string()))
+            for column in self.columns
+        )
+        self.rows = 0
+        self._buffer = {column: [] for column in self.columns}
+        self._buffered = 0
+        if filename.endswith((".arrow", ".feather", ".ipc")):
+            self._writer = pyarrow.ipc.new_file(filename, self.schema)
+        else:
+            self._writer = pyarrow.parquet.ParquetWriter(filename, self.schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, item, **extra):
+        if self.kind == "comments":
+            # flatten the whole tree first, so an id-less comment raises
+            # before any of its rows are buffered
+            rows = list(_flatten_comments([item], extra.pop("parent_id", None)))
+        else:
+            rows = [to_dict(item)]
+        for row in rows:
+            row.update(extra)
+            if self.kind != "comments" and not row.get("id"):
+                row["id"] = _reddit_id(row)
+            if self.kind == "posts" and not row.get("subreddit"):
+                row["subreddit"], _, _ = _permalink_parts(row.get("permalink"))
+            for column in self.columns:
+                value = row.get(column)
+                if column in NUMERIC_COLUMNS:
+                    value = _number(value)
+                elif value is not None:
+                    value = str(value)
+                self._buffer[column].append(value)
+            self._buffered += 1
+            if self._buffered >= self.row_group_size:
+                self.flush()
+
+    def write_many(self, items, **extra):
+        for item in items:
+            self.write(item, **extra)
+
+    def flush(self):
+        if not self._buffered:
+            return
+        batch = pyarrow.RecordBatch.from_pydict(self._buffer, schema=self.schema)
+        if isinstance(self._writer, pyarrow.parquet.ParquetWriter):
+            self._writer.write_batch(batch, row_group_size=self._buffered)
+        else:
+            self._writer.write_batch(batch)
+        self.rows += self._buffered
+        for values in self._buffer.values():
+            values.clear()
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+def export_to_parquet(data, filename="output.parquet", kind="posts"):
+    try:
+        with ColumnarWriter(filename, kind) as writer:
+            writer.write_many(data)
+        print(f"Data successfully exported to {filename}")
+    except Exception as e:
+        print(f"Error exporting to {filename}: {e}")
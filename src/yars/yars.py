@@ -1,12 +1,35 @@
 from __future__ import annotations
 from .sessions import RandomUserAgentSession
+from .ratelimit import RateLimiter, retry_after
+from .cache import MISSING, LRUCache, ResponseCache
+from .checkpoint import Checkpoint, ListingCrawl
+from .seen import SeenSet
+from .models import Post, UserItem
+from .proxies import ProxyPool
+from .jsonlib import get_loads
+from .parsers import (
+    CommentSplicer,
+    iter_comments,
+    listing_url,
+    parse_post_details,
+    post_extractor,
+    search_result_extractor,
+    since_predicate,
+    user_item_extractor,
+)
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+import os
 import time
-import random
 import logging
 import requests
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 
+RATE_LIMIT_RETRIES = 5
+MORE_CHILDREN_ROUNDS = 10
+MORE_CHILDREN_WORKERS = 4
+
 logger = logging.basicConfig(
     filename="YARS.log",
     level=logging.INFO,
@@ -15,276 +38,621 @@ logger = logging.basicConfig(
 
 
 class YARS:
-    __slots__ = ("headers", "session", "proxy", "timeout")
-
-    def __init__(self, proxy=None, timeout=10, random_user_agent=True):
+    __slots__ = (
+        "headers",
+        "session",
+        "proxy",
+        "proxy_pool",
+        "timeout",
+        "rate_limiter",
+        "cache",
+        "memo",
+        "pool_maxsize",
+        "json_loads",
+        "models",
+        "prefetch",
+        "seen",
+    )
+
+    def __init__(
+        self,
+        proxy=None,
+        timeout=10,
+        random_user_agent=True,
+        rate_limit=30,
+        rate_window=60,
+        rate_limiter=None,
+        cache=None,
+        memo_size=0,
+        memo_max_age=300,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        warm_up=False,
+        json_backend=None,
+        models=False,
+        prefetch=True,
+        seen=None,
+    ):
         self.session = RandomUserAgentSession() if random_user_agent else requests.Session()
         self.proxy = proxy
+        # a list of proxies (or a ProxyPool) rotates per request by health
+        if isinstance(proxy, (list, tuple)):
+            proxy = ProxyPool(proxy)
+        self.proxy_pool = proxy if isinstance(proxy, ProxyPool) else None
         self.timeout = timeout
-
+        # An explicit limiter can be shared between several YARS/AsyncYARS
+        # instances; rate_limit=None disables client-side pacing entirely.
+        if rate_limiter is None and rate_limit:
+            rate_limiter = RateLimiter(rate_limit, rate_window)
+        self.rate_limiter = rate_limiter
+        # cache may be a ResponseCache or a directory to keep one in
+        if isinstance(cache, (str, os.PathLike)):
+            cache = ResponseCache(cache)
+        self.cache = cache
+        # in-process memo of parsed post/user results, off unless memo_size > 0
+        self.memo = LRUCache(memo_size, memo_max_age) if memo_size else None
+        # "orjson", "msgspec" or "json"; None picks the fastest one installed
+        self.json_loads = get_loads(json_backend)
+        # return yars.models objects instead of dicts for posts/comments/items
+        self.models = models
+        # fetch the next listing page in the background while iterating
+        self.prefetch = prefetch
+        # ids already processed (a SeenSet or the file to keep one in);
+        # listing iterators skip them and record each item the caller moved
+        # past; the list methods consume, and so record, their whole result
+        if isinstance(seen, (str, os.PathLike)):
+            seen = SeenSet(seen)
+        self.seen = seen
+
+        # 429s are handled in _get so the wait is shared through the limiter
         retries = Retry(
             total=5,
             backoff_factor=2,  # Exponential backoff
-            status_forcelist=[429, 500, 502, 503, 504],
+            status_forcelist=[500, 502, 503, 504],
         )
 
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
+        # pool_connections is the number of hosts kept pooled, pool_maxsize the
+        # keep-alive connections per host; size it to the number of threads
+        # sharing this instance (e.g. scrape_post_details_many workers)
+        self.pool_maxsize = pool_maxsize
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=retries,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
-        if proxy:
+        if proxy and self.proxy_pool is None:
             self.session.proxies.update({"http": proxy, "https": proxy})
-    def handle_search(self,url, params, after=None, before=None):
+
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self, connections=None, url="https://www.reddit.com/robots.txt"):
+        """
+        Open ``connections`` keep-alive connections to Reddit ahead of a
+        burst, so the first requests don't all pay for a TLS handshake.
+
+        Defaults to filling the per-host pool. Warm-up requests are cheap
+        HEADs and don't draw from the rate limiter.
+        """
+        connections = connections or self.pool_maxsize
+
+        def head(_):
+            try:
+                self.session.head(url, timeout=self.timeout)
+                return True
+            except requests.RequestException as e:
+                logging.info("Warm-up request failed: %s", e)
+                return False
+
+        # concurrent requests each check out their own pooled connection
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            opened = sum(executor.map(head, range(connections)))
+        logging.info("Warmed up %d connections to %s", opened, url)
+        return opened
+
+    def _get(self, url, params=None, kind="listing"):
+        if self.cache is None:
+            return self._request(url, params)
+
+        cache_key = self.cache.key(url, params)
+        entry = self.cache.get(cache_key)
+        if entry is not None and self.cache.is_fresh(entry, kind):
+            logging.info("Cache hit: %s", url)
+            return self.cache.to_response(entry)
+
+        response = self._request(url, params, self.cache.validators(entry))
+        if response.status_code == 304 and entry is not None:
+            logging.info("Cache revalidated: %s", url)
+            self.cache.touch(cache_key, entry)
+            return self.cache.to_response(entry)
+        if response.status_code == 200:
+            self.cache.set(cache_key, response)
+        return response
+
+    def _request(self, url, params=None, headers=None):
+        # how long a retry may wait for a proxy to leave quarantine
+        pool_wait = 0
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            if self.proxy_pool is not None:
+                last_attempt = attempt == RATE_LIMIT_RETRIES
+                response = self._request_via_pool(
+                    url, params, headers, last_attempt, pool_wait
+                )
+                if response is None:
+                    pool_wait = 2 * (2**attempt)
+                    continue
+            else:
+                response = self.session.get(
+                    url, params=params, headers=headers, timeout=self.timeout
+                )
+                # Reddit's budget is per IP, so only adapt to it on one egress
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update(response.headers)
+            if response.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+                return response
+
+            logging.info("Rate limited on %s (attempt %d)", url, attempt + 1)
+            if self.proxy_pool is not None:
+                # that proxy is now quarantined, the retry waits up to the
+                # usual backoff for a healthy one
+                pool_wait = retry_after(response.headers) or 2 * (2**attempt)
+                continue
+            delay = retry_after(response.headers)
+            if delay is None:
+                delay = 2 * (2**attempt)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.pause(delay)
+            if self.rate_limiter is None:
+                time.sleep(delay)
+        return response
+
+    def _request_via_pool(self, url, params, headers, raise_errors, max_wait=0):
+        delay = min(self.proxy_pool.wait_time(), max_wait)
+        if delay:
+            logging.info("Every proxy is quarantined, waiting %.1fs", delay)
+            time.sleep(delay)
+        proxy = self.proxy_pool.choose()
+        start = time.monotonic()
+        try:
+            response = self.session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=self.timeout,
+                proxies={"http": proxy, "https": proxy},
+            )
+        except requests.RequestException as e:
+            self.proxy_pool.report(proxy, error=True)
+            if raise_errors:
+                raise
+            logging.info("Request through proxy %s failed: %s", proxy, e)
+            return None
+        self.proxy_pool.report(
+            proxy,
+            time.monotonic() - start,
+            response.status_code,
+            retry_after=retry_after(response.headers),
+        )
+        return response
+
+    def _fetch_page(self, url, params, kind):
+        response = self._get(url, params, kind)
+        response.raise_for_status()
+        return self.json_loads(response.content)["data"]
+
+    def _iter_listing(
+        self,
+        url,
+        params,
+        description,
+        make_item,
+        limit=None,
+        kind="listing",
+        checkpoint=None,
+        stop=None,
+    ):
+        """
+        Yield ``make_item(child)`` for up to ``limit`` children of a listing,
+        following its cursor page by page; see ListingCrawl for ``limit``,
+        ``checkpoint``, ``stop`` and the client's ``seen`` set.
+
+        With ``prefetch`` on, page N+1 is requested on a background thread
+        while the consumer works through page N, and closing the iterator
+        drops a pending one.
+        """
+        crawl = ListingCrawl(
+            url,
+            params,
+            description,
+            limit,
+            checkpoint,
+            self.seen,
+            self.rate_limiter,
+            stop,
+        )
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        pending = None
+        finished = False
+        try:
+            while crawl.next_params is not None:
+                try:
+                    if pending is not None:
+                        listing = pending.result()
+                    else:
+                        listing = self._fetch_page(url, crawl.next_params, kind)
+                except Exception as e:
+                    if crawl.failed(e):
+                        raise
+                    break
+                children = crawl.page(listing)
+                pending = None
+                if crawl.next_params is not None and executor is not None:
+                    pending = executor.submit(
+                        self._fetch_page, url, crawl.next_params, kind
+                    )
+                yield from crawl.items(children, make_item)
+            finished = True
+        finally:
+            if executor is not None:
+                if pending is not None:
+                    pending.cancel()
+                executor.shutdown(wait=False)
+            crawl.close(finished)
+
+    def _collect(self, items, checkpoint, model):
+        """
+        List ``items`` after those an interrupted run with the same
+        ``checkpoint`` had already collected.
+        """
+        if checkpoint is None:
+            return list(items)
+        for item in items:
+            checkpoint.items.append(item)
+        return checkpoint.collected(model if self.models else None)
+
+    def _iter_search(self, url, params, limit, after, before, fields):
+        params = {**params, "limit": min(100, limit or 100)}
         if after:
             params["after"] = after
         if before:
             params["before"] = before
-
-        try:
-            response = self.session.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            logging.info("Search request successful")
-        except Exception as e:
-            if response.status_code != 200:
-                logging.info("Search request unsuccessful due to: %s", e)
-                print(f"Failed to fetch search results: {response.status_code}")
-                return []
-
-        data = response.json()
-        results = []
-        for post in data["data"]["children"]:
-            post_data = post["data"]
-            results.append(
-                {
-                    "title": post_data["title"],
-                    "link": f"https://www.reddit.com{post_data['permalink']}",
-                    "description": post_data.get("selftext", "")[:269],
-                }
-            )
-        logging.info("Search Results Retrned %d Results", len(results))
+        make_result = search_result_extractor(fields)
+        return self._iter_listing(url, params, "search results", make_result, limit)
+
+    def iter_search(
+        self,
+        query,
+        subreddit=None,
+        limit=10,
+        after=None,
+        before=None,
+        sort="relevance",
+        fields=None,
+    ):
+        """
+        Lazily yield search results across as many pages as ``limit``
+        needs (None for no limit), restricted to ``subreddit`` if given.
+        """
+        params = {"q": query, "sort": sort, "type": "link"}
+        if subreddit:
+            url = f"https://www.reddit.com/r/{subreddit}/search.json"
+            params["restrict_sr"] = "on"
+        else:
+            url = "https://www.reddit.com/search.json"
+        return self._iter_search(url, params, limit, after, before, fields)
+
+    def handle_search(self, url, params, after=None, before=None, fields=None):
+        limit = params.get("limit", 10)
+        results = list(self._iter_search(url, params, limit, after, before, fields))
+        logging.info("Search Results Returned %d Results", len(results))
         return results
-    def search_reddit(self, query, limit=10, after=None, before=None):
+
+    def search_reddit(self, query, limit=10, after=None, before=None, fields=None):
         url = "https://www.reddit.com/search.json"
         params = {"q": query, "limit": limit, "sort": "relevance", "type": "link"}
-        return self.handle_search(url, params, after, before)
-    def search_subreddit(self, subreddit, query, limit=10, after=None, before=None, sort="relevance"):
+        return self.handle_search(url, params, after, before, fields)
+
+    def search_subreddit(
+        self,
+        subreddit,
+        query,
+        limit=10,
+        after=None,
+        before=None,
+        sort="relevance",
+        fields=None,
+    ):
         url = f"https://www.reddit.com/r/{subreddit}/search.json"
-        params = {"q": query, "limit": limit, "sort": "relevance", "type": "link","restrict_sr":"on"}
-        return self.handle_search(url, params, after, before)
+        params = {
+            "q": query,
+            "limit": limit,
+            "sort": sort,
+            "type": "link",
+            "restrict_sr": "on",
+        }
+        return self.handle_search(url, params, after, before, fields)
+
+    def _fetch_more_children(self, link_id, children):
+        params = {
+            "api_type": "json",
+            "link_id": link_id,
+            "children": ",".join(children),
+            "limit_children": "false",
+            "raw_json": 1,
+        }
+        try:
+            response = self._get(
+                "https://www.reddit.com/api/morechildren.json", params, kind="post"
+            )
+            response.raise_for_status()
+            return self.json_loads(response.content)["json"]["data"]["things"]
+        except Exception as e:
+            logging.info("More children request unsuccessful: %s", e)
+            return None
+
+    def _expand_more_comments(self, post_data):
+        link_id = post_data[0]["data"]["children"][0]["data"]["name"]
+        splicer = CommentSplicer(post_data[1]["data"]["children"])
+        workers = MORE_CHILDREN_WORKERS
+        for _ in range(MORE_CHILDREN_ROUNDS):
+            batches = splicer.next_batches()
+            if not batches:
+                break
+            with ThreadPoolExecutor(max_workers=min(len(batches), workers)) as executor:
+                results = list(
+                    executor.map(
+                        lambda batch: self._fetch_more_children(link_id, batch),
+                        batches,
+                    )
+                )
+            for batch, things in zip(batches, results):
+                if things is None:
+                    # Reddit turns down concurrent morechildren calls, so
+                    # retry the failed ids one request at a time
+                    splicer.failed(batch)
+                    workers = 1
+                else:
+                    splicer.splice(batch, things)
+            logging.info("Expanded %d more-comments batches", len(batches))
+
+        missing = splicer.finish()
+        if missing:
+            logging.info("%d more comments could not be loaded", missing)
+            print(f"Could not load {missing} more comments, their stubs are kept")
+        return missing
+
+    def _fetch_post_details(self, permalink, fields=None, expand_more=False):
+        memo_key = ("post", permalink, fields and tuple(fields), expand_more)
+        if self.memo is not None:
+            post_details = self.memo.get(memo_key)
+            if post_details is not MISSING:
+                return post_details
 
-    def scrape_post_details(self, permalink):
         url = f"https://www.reddit.com{permalink}.json"
 
+        response = self._get(url, kind="post")
+        response.raise_for_status()
+        logging.info("Post details request successful : %s", url)
+
+        post_data = self.json_loads(response.content)
+        if expand_more and isinstance(post_data, list) and len(post_data) >= 2:
+            self._expand_more_comments(post_data)
+        post_details = parse_post_details(post_data, self.models, fields)
+        if post_details is None:
+            logging.info("Unexpected post data structure")
+        elif self.memo is not None:
+            self.memo.set(memo_key, post_details)
+        return post_details
+
+    def scrape_post_details(self, permalink, fields=None, expand_more=False):
         try:
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            logging.info("Post details request successful : %s", url)
+            post_details = self._fetch_post_details(permalink, fields, expand_more)
         except Exception as e:
-            logging.info("Post details request unsccessful: %e", e)
-            if response.status_code != 200:
-                print(f"Failed to fetch post data: {response.status_code}")
-                return None
-
-        post_data = response.json()
-        if not isinstance(post_data, list) or len(post_data) < 2:
-            logging.info("Unexpected post data structre")
-            print("Unexpected post data structure")
+            logging.info("Post details request unsuccessful: %s", e)
+            print(f"Failed to fetch post data: {e}")
             return None
 
-        main_post = post_data[0]["data"]["children"][0]["data"]
-        title = main_post["title"]
-        body = main_post.get("selftext", "")
-
-        comments = self._extract_comments(post_data[1]["data"]["children"])
-        logging.info("Successfully scraped post: %s", title)
-        return {"title": title, "body": body, "comments": comments}
-
-    def _extract_comments(self, comments):
-        logging.info("Extracting comments")
-        extracted_comments = []
-        for comment in comments:
-            if isinstance(comment, dict) and comment.get("kind") == "t1":
-                comment_data = comment.get("data", {})
-                extracted_comment = {
-                    "author": comment_data.get("author", ""),
-                    "body": comment_data.get("body", ""),
-                    "score": comment_data.get("score",""),
-                    "replies": [],
-                }
-
-                replies = comment_data.get("replies", "")
-                if isinstance(replies, dict):
-                    extracted_comment["replies"] = self._extract_comments(
-                        replies.get("data", {}).get("children", [])
-                    )
-                extracted_comments.append(extracted_comment)
-        logging.info("Successfully extracted comments")
-        return extracted_comments
+        if post_details is None:
+            print("Unexpected post data structure")
+            return None
 
-    def scrape_user_data(self, username, limit=10):
-        logging.info("Scraping user data for %s, limit: %d", username, limit)
-        base_url = f"https://www.reddit.com/user/{username}/.json"
-        params = {"limit": limit, "after": None}
-        all_items = []
-        count = 0
+        logging.info("Successfully scraped post: %s", post_details["title"])
+        return post_details
 
-        while count < limit:
-            try:
-                response = self.session.get(
-                    base_url, params=params, timeout=self.timeout
+    def scrape_post_details_many(
+        self, permalinks, max_workers=8, fields=None, expand_more=False
+    ):
+        """
+        Scrape many posts concurrently on this instance's session.
+
+        Yields ``(permalink, post_details, error)`` tuples as each post
+        finishes; a failed post carries its exception in ``error`` instead
+        of aborting the batch. At most ``max_workers`` requests are in
+        flight, and permalinks are consumed lazily from the iterable.
+        """
+        permalinks = iter(permalinks)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
+
+            def submit(permalink):
+                future = executor.submit(
+                    self._fetch_post_details, permalink, fields, expand_more
                 )
-                response.raise_for_status()
-                logging.info("User data request successful")
-            except Exception as e:
-                logging.info("User data request unsuccessful: %s", e)
-                if response.status_code != 200:
-                    print(
-                        f"Failed to fetch data for user {username}: {response.status_code}"
-                    )
-                    break
+                pending[future] = permalink
+
             try:
-                data = response.json()
-            except ValueError:
-                print(f"Failed to parse JSON response for user {username}.")
-                break
+                for permalink in islice(permalinks, max_workers):
+                    submit(permalink)
+
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        permalink = pending.pop(future)
+                        for next_permalink in islice(permalinks, 1):
+                            submit(next_permalink)
+
+                        error = future.exception()
+                        post_details = None if error else future.result()
+                        if error is None and post_details is None:
+                            error = ValueError("Unexpected post data structure")
+                        if error is not None:
+                            logging.info("Post details request unsuccessful: %s", error)
+                        yield permalink, post_details, error
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def iter_post_comments(self, permalink, fields=None, expand_more=False):
+        """
+        Yield a post's comments one at a time, depth first, each with its
+        ``id``, ``parent_id`` and ``depth`` instead of nested ``replies``.
+        """
+        url = f"https://www.reddit.com{permalink}.json"
+        try:
+            response = self._get(url, kind="post")
+            response.raise_for_status()
+            post_data = self.json_loads(response.content)
+            if expand_more:
+                self._expand_more_comments(post_data)
+            comments = post_data[1]["data"]["children"]
+        except Exception as e:
+            logging.info("Post comments request unsuccessful: %s", e)
+            print(f"Failed to fetch post comments: {e}")
+            return
 
-            if "data" not in data or "children" not in data["data"]:
-                print(
-                    f"No 'data' or 'children' field found in response for user {username}."
-                )
-                logging.info("No 'data' or 'children' field found in response")
-                break
+        yield from iter_comments(comments, self.models, fields)
 
-            items = data["data"]["children"]
-            if not items:
-                print(f"No more items found for user {username}.")
-                logging.info("No more items found for user")
-                break
+    def iter_user_items(self, username, limit=10, fields=None, checkpoint=None):
+        """
+        Lazily yield a user's recent posts and comments, page by page.
 
-            for item in items:
-                kind = item["kind"]
-                item_data = item["data"]
-                if kind == "t3":
-                    post_url = f"https://www.reddit.com{item_data.get('permalink', '')}"
-                    all_items.append(
-                        {
-                            "type": "post",
-                            "title": item_data.get("title", ""),
-                            "subreddit": item_data.get("subreddit", ""),
-                            "url": post_url,
-                            "created_utc": item_data.get("created_utc", ""),
-                        }
-                    )
-                elif kind == "t1":
-                    comment_url = (
-                        f"https://www.reddit.com{item_data.get('permalink', '')}"
-                    )
-                    all_items.append(
-                        {
-                            "type": "comment",
-                            "subreddit": item_data.get("subreddit", ""),
-                            "body": item_data.get("body", ""),
-                            "created_utc": item_data.get("created_utc", ""),
-                            "url": comment_url,
-                        }
-                    )
-                count += 1
-                if count >= limit:
-                    break
+        ``checkpoint`` (a Checkpoint or a file path) makes the crawl
+        resumable, see Checkpoint.
+        """
+        base_url = f"https://www.reddit.com/user/{username}/.json"
+        params = {"limit": min(100, limit or 100)}
+        make_item = user_item_extractor(fields, self.models)
+        return self._iter_listing(
+            base_url,
+            params,
+            f"data for user {username}",
+            make_item,
+            limit,
+            kind="user",
+            checkpoint=checkpoint,
+        )
 
-            params["after"] = data["data"].get("after")
-            if not params["after"]:
-                break
+    def scrape_user_data(self, username, limit=10, fields=None, checkpoint=None):
+        logging.info("Scraping user data for %s, limit: %s", username, limit)
+        memo_key = ("user", username, limit, fields and tuple(fields))
+        if self.memo is not None:
+            all_items = self.memo.get(memo_key)
+            if all_items is not MISSING:
+                return all_items
 
-            time.sleep(random.uniform(1, 2))
-            logging.info("Sleeping for random time")
+        if isinstance(checkpoint, (str, os.PathLike)):
+            checkpoint = Checkpoint(checkpoint)
+        items = self.iter_user_items(username, limit, fields, checkpoint)
+        all_items = self._collect(items, checkpoint, UserItem)
 
         logging.info("Successfully scraped user data for %s", username)
+        if self.memo is not None and all_items:
+            self.memo.set(memo_key, all_items)
         return all_items
 
+    def iter_subreddit_posts(
+        self,
+        subreddit,
+        limit=10,
+        category="hot",
+        time_filter="all",
+        fields=None,
+        checkpoint=None,
+        since_fullname=None,
+        since_utc=None,
+        use_before=False,
+        max_image_width=None,
+        image_variant=None,
+    ):
+        """
+        Lazily yield posts from a subreddit (or a user's submissions),
+        fetching the next page only when the current one is used up.
+
+        ``checkpoint`` (a Checkpoint or a file path) makes the crawl
+        resumable, see Checkpoint.
+
+        For polling a "new" listing, ``since_fullname`` and ``since_utc``
+        stop paging at the last post seen or at the first post created at
+        or before that time. ``use_before=True`` instead asks Reddit for
+        the posts newer than ``since_fullname`` with the ``before`` cursor,
+        each page newer than the last; it returns nothing if that post has
+        since been removed.
+
+        ``max_image_width`` sets ``image_url`` to the smallest of Reddit's
+        preview resolutions at least that wide instead of the original
+        upload, and ``image_variant`` ("gif", "mp4", ...) picks from that
+        variant of the preview when the post has it.
+        """
+        url = listing_url(subreddit, category)
+        make_post = post_extractor(fields, self.models, max_image_width, image_variant)
+        params = {"limit": min(100, limit or 100), "raw_json": 1, "t": time_filter}
+        if use_before and since_fullname:
+            params["before"] = since_fullname
+            since_fullname = None
+        return self._iter_listing(
+            url,
+            params,
+            f"posts for subreddit/user {subreddit}",
+            make_post,
+            limit,
+            checkpoint=checkpoint,
+            stop=since_predicate(since_fullname, since_utc),
+        )
+
     def fetch_subreddit_posts(
-        self, subreddit, limit=10, category="hot", time_filter="all"
+        self,
+        subreddit,
+        limit=10,
+        category="hot",
+        time_filter="all",
+        fields=None,
+        checkpoint=None,
+        since_fullname=None,
+        since_utc=None,
+        use_before=False,
+        max_image_width=None,
+        image_variant=None,
     ):
         logging.info(
-            "Fetching subreddit/user posts for %s, limit: %d, category: %s, time_filter: %s",
+            "Fetching subreddit/user posts for %s, limit: %s, category: %s, time_filter: %s",
             subreddit,
             limit,
             category,
             time_filter,
         )
-        if category not in ["hot", "top", "new", "userhot", "usertop", "usernew"]:
-            raise ValueError("Category for Subredit must be either 'hot', 'top', or 'new' or for User must be 'userhot', 'usertop', or 'usernew'")
-
-        batch_size = min(100, limit)
-        total_fetched = 0
-        after = None
-        all_posts = []
-
-        while total_fetched < limit:
-            if category == "hot":
-                url = f"https://www.reddit.com/r/{subreddit}/hot.json"
-            elif category == "top":
-                url = f"https://www.reddit.com/r/{subreddit}/top.json"
-            elif category == "new":
-                url = f"https://www.reddit.com/r/{subreddit}/new.json"
-            elif category == "userhot":
-                url = f"https://www.reddit.com/user/{subreddit}/submitted/hot.json"
-            elif category == "usertop":
-                url = f"https://www.reddit.com/user/{subreddit}/submitted/top.json"
-            else:
-                url = f"https://www.reddit.com/user/{subreddit}/submitted/new.json"
-
-            params = {
-                "limit": batch_size,
-                "after": after,
-                "raw_json": 1,
-                "t": time_filter,
-            }
-            try:
-                response = self.session.get(url, params=params, timeout=self.timeout)
-                response.raise_for_status()
-                logging.info("Subreddit/user posts request successful")
-            except Exception as e:
-                logging.info("Subreddit/user posts request unsuccessful: %s", e)
-                if response.status_code != 200:
-                    print(
-                        f"Failed to fetch posts for subreddit/user {subreddit}: {response.status_code}"
-                    )
-                    break
-
-            data = response.json()
-            posts = data["data"]["children"]
-            if not posts:
-                break
-
-            for post in posts:
-                post_data = post["data"]
-                post_info = {
-                    "title": post_data["title"],
-                    "author": post_data["author"],
-                    "permalink": post_data["permalink"],
-                    "score": post_data["score"],
-                    "num_comments": post_data["num_comments"],
-                    "created_utc": post_data["created_utc"],
-                }
-                if post_data.get("post_hint") == "image" and "url" in post_data:
-                    post_info["image_url"] = post_data["url"]
-                elif "preview" in post_data and "images" in post_data["preview"]:
-                    post_info["image_url"] = post_data["preview"]["images"][0][
-                        "source"
-                    ]["url"]
-                if "thumbnail" in post_data and post_data["thumbnail"] != "self":
-                    post_info["thumbnail_url"] = post_data["thumbnail"]
-
-                all_posts.append(post_info)
-                total_fetched += 1
-                if total_fetched >= limit:
-                    break
-
-            after = data["data"].get("after")
-            if not after:
-                break
-
-            time.sleep(random.uniform(1, 2))
-            logging.info("Sleeping for random time")
+        if isinstance(checkpoint, (str, os.PathLike)):
+            checkpoint = Checkpoint(checkpoint)
+        posts = self.iter_subreddit_posts(
+            subreddit,
+            limit,
+            category,
+            time_filter,
+            fields,
+            checkpoint,
+            since_fullname,
+            since_utc,
+            use_before,
+            max_image_width,
+            image_variant,
+        )
+        all_posts = self._collect(posts, checkpoint, Post)
 
         logging.info("Successfully fetched subreddit posts for %s", subreddit)
         return all_posts